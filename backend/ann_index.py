@@ -0,0 +1,234 @@
+import os
+import threading
+
+import numpy as np
+
+from similarity import normalize_rows, top_k
+from quantization import (INDEX_PRECISION, RERANK_FACTOR, check_precision, precision_of,
+                          quantizer_type, train_fixed_range)
+
+try:
+    import faiss
+except ImportError:  # Exact search only
+    faiss = None
+
+
+# Tuning knobs; larger values trade latency for recall
+ANN_MIN_ROWS = int(os.environ.get('RFP_ANN_MIN_ROWS', 10000))  # Exact search below this corpus size
+ANN_HNSW_M = int(os.environ.get('RFP_ANN_HNSW_M', 32))  # Graph neighbours per node
+ANN_EF_CONSTRUCTION = int(os.environ.get('RFP_ANN_EF_CONSTRUCTION', 200))
+ANN_EF_SEARCH = int(os.environ.get('RFP_ANN_EF_SEARCH', 128))
+ANN_SAVE_EVERY = int(os.environ.get('RFP_ANN_SAVE_EVERY', 1000))  # Rows added between saves
+# Searches start a background sync once this many rows are missing from the index,
+# e.g. rows ingested by other worker processes
+ANN_SYNC_LAG = int(os.environ.get('RFP_ANN_SYNC_LAG', 500))
+
+
+class AnnIndex:
+    """
+    Persisted FAISS HNSW index over the normalized document embeddings.
+
+    Inner product on unit-length vectors is cosine similarity, so results are
+    comparable with the exact search. Row i of the index is row i of the
+    embedding store. Rows the index has not caught up with yet are scored
+    exactly and merged in, so a lagging index never hides documents.
+
+    At float16 or int8 precision the graph stores scalar-quantized vectors
+    (IndexHNSWSQ); its candidates are re-ranked with the exact rows.
+    """
+
+    ADD_CHUNK = 1000  # Rows added per lock acquisition
+
+    def __init__(self, path, min_rows=ANN_MIN_ROWS, m=ANN_HNSW_M,
+                 ef_construction=ANN_EF_CONSTRUCTION, ef_search=ANN_EF_SEARCH,
+                 precision=INDEX_PRECISION, rerank_factor=RERANK_FACTOR, sync_lag=ANN_SYNC_LAG):
+        """
+        Args:
+            path (str): File the index is persisted to
+            min_rows (int): Corpus size below which exact search is used
+            m (int): HNSW graph degree
+            ef_construction (int): HNSW build-time candidate list size
+            ef_search (int): HNSW query-time candidate list size
+            precision (str): Vector precision in the graph: 'float32', 'float16' or 'int8'
+            rerank_factor (int): Candidates re-ranked per result at lower precisions
+            sync_lag (int): Missing rows at which a search starts a background sync
+        """
+        self.path = path
+        self.min_rows = min_rows
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.precision = check_precision(precision) if faiss is not None else 'float32'
+        self.rerank_factor = max(1, rerank_factor)
+        self.sync_lag = sync_lag
+        self.index = None
+        self._unsaved = 0
+        self._background_sync = None
+        self._lock = threading.Lock()  # Guards index adds against concurrent searches
+        self._sync_lock = threading.Lock()
+
+    @property
+    def available(self):
+        return faiss is not None
+
+    @property
+    def size(self):
+        return self.index.ntotal if self.index is not None else 0
+
+    def load(self, store_rows):
+        """
+        Load the persisted index if it is consistent with the store.
+
+        Args:
+            store_rows (int): Number of rows currently in the embedding store
+        """
+        if faiss is None or not os.path.exists(self.path):
+            return
+        index = faiss.read_index(self.path)
+        if index.ntotal > store_rows:
+            # Index is ahead of the store (store rebuilt); start over
+            return
+        if self._precision_of(index) != self.precision:
+            # Built at another RFP_INDEX_PRECISION; rebuild
+            return
+        index.hnsw.efSearch = self.ef_search
+        self.index = index
+
+    @staticmethod
+    def _precision_of(index):
+        storage = faiss.downcast_index(index.storage)
+        if isinstance(storage, faiss.IndexScalarQuantizer):
+            return precision_of(storage.sq)
+        return 'float32' if isinstance(storage, faiss.IndexFlat) else None
+
+    def _new_index(self, dim):
+        if self.precision == 'float32':
+            index = faiss.IndexHNSWFlat(dim, self.m, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWSQ(dim, quantizer_type(self.precision), self.m,
+                                      faiss.METRIC_INNER_PRODUCT)
+            train_fixed_range(index, dim)
+        index.hnsw.efConstruction = self.ef_construction
+        index.hnsw.efSearch = self.ef_search
+        return index
+
+    def sync(self, snapshot):
+        """
+        Add the rows of an IndexSnapshot the index does not contain yet.
+
+        Does nothing until the corpus reaches `min_rows`.
+
+        Returns:
+            int: Number of rows added
+        """
+        if faiss is None or snapshot.count < self.min_rows:
+            return 0
+
+        with self._sync_lock:
+            if self.index is None:
+                self.index = self._new_index(snapshot.matrix.shape[1])
+
+            added = 0
+            while self.index.ntotal < snapshot.count:
+                start = self.index.ntotal
+                stop = min(start + self.ADD_CHUNK, snapshot.count)
+                chunk = np.ascontiguousarray(snapshot.matrix[start:stop], dtype=np.float32)
+                with self._lock:
+                    self.index.add(chunk)
+                added += stop - start
+
+            self._unsaved += added
+            if self._unsaved >= ANN_SAVE_EVERY:
+                self.save()
+            return added
+
+    def sync_in_background(self, snapshot):
+        """
+        Start a sync in a background thread if the index lags the snapshot by
+        more than `sync_lag` rows and no background sync is running.
+
+        Returns:
+            bool: Whether a sync was started
+        """
+        if faiss is None or snapshot.count < self.min_rows or snapshot.count - self.size <= self.sync_lag:
+            return False
+        with self._lock:
+            if self._background_sync is not None and self._background_sync.is_alive():
+                return False
+            self._background_sync = threading.Thread(target=self.sync, args=(snapshot,), daemon=True)
+            self._background_sync.start()
+        return True
+
+    def save(self):
+        """
+        Write the index to disk atomically.
+        """
+        if self.index is None:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+    def search(self, snapshot, query_vector, k, exclude_rows=(), rows=None):
+        """
+        Top-K search over an IndexSnapshot.
+
+        Uses exact search for small corpora or when FAISS is unavailable.
+        A search restricted to `rows` scores those rows exactly while there
+        are fewer than `min_rows` of them; larger restrictions are passed to
+        HNSW as an ID selector. When the index lags the snapshot by more than
+        `sync_lag` rows, a background sync is started.
+
+        Args:
+            snapshot (IndexSnapshot): Current resident index
+            query_vector (np.ndarray): (dim,) query embedding
+            k (int): Number of results
+            exclude_rows (iterable): Rows that must not appear in the results
+            rows (np.ndarray): Sorted rows to search among; None searches every row
+
+        Returns:
+            tuple: (rows, scores) sorted by descending cosine similarity
+        """
+        exclude_rows = set(exclude_rows)
+        # Keep the exactly scored tail short when other processes add rows
+        self.sync_in_background(snapshot)
+        if (self.index is None or snapshot.count < self.min_rows
+                or (rows is not None and len(rows) < self.min_rows)):
+            return top_k(snapshot.matrix, query_vector, k, exclude_rows=exclude_rows, rows=rows)
+
+        query = normalize_rows(np.asarray(query_vector).reshape(1, -1))
+        wanted = k if self.precision == 'float32' else k * self.rerank_factor
+        with self._lock:
+            indexed = min(self.index.ntotal, snapshot.count)
+            if rows is None:
+                scores, labels = self.index.search(query, wanted + len(exclude_rows))
+            else:
+                selector = faiss.IDSelectorBatch(rows[:np.searchsorted(rows, indexed)])
+                params = faiss.SearchParametersHNSW()
+                params.sel = selector
+                params.efSearch = self.ef_search
+                scores, labels = self.index.search(query, wanted + len(exclude_rows), params=params)
+        results = [(float(score), int(row)) for score, row in zip(scores[0], labels[0])
+                   if row != -1 and row < indexed and row not in exclude_rows]
+        if self.precision != 'float32' and results:
+            # Re-rank the quantized candidates with their exact vectors
+            candidates = np.array([row for _, row in results], dtype=np.int64)
+            exact = snapshot.matrix[candidates] @ query[0]
+            results = [(float(score), int(row)) for score, row in zip(exact, candidates)]
+
+        # Rows uploaded since the last sync are scored exactly
+        if indexed < snapshot.count:
+            tail = None if rows is None else rows[np.searchsorted(rows, indexed):] - indexed
+            tail_rows, tail_scores = top_k(
+                snapshot.matrix[indexed:snapshot.count], query[0], k,
+                exclude_rows=[row - indexed for row in exclude_rows if row >= indexed],
+                rows=tail
+            )
+            results.extend((float(score), int(row) + indexed) for row, score in zip(tail_rows, tail_scores))
+
+        results.sort(key=lambda pair: pair[0], reverse=True)
+        results = results[:k]
+        return (np.array([row for _, row in results], dtype=np.int64),
+                np.array([score for score, _ in results], dtype=np.float32))
@@ -1,5 +1,5 @@
-from flask import Flask, request, jsonify, send_file, after_this_request
-from openai import OpenAI, OpenAIError
+from flask import Flask, request, jsonify, send_file, after_this_request, Response, stream_with_context, g
+from openai import OpenAIError, NotFoundError
 
 import shutil
 import glob
@@ -13,9 +13,28 @@ from datetime import datetime  # Import datetime module
 import os
 import json
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import pdfplumber
-from sentence_transformers import SentenceTransformer
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from model_registry import get_model, warm_up, is_ready, status as model_status
+from embedding_store import EmbeddingStore
+from index_cache import IndexCache
+from ann_index import AnnIndex
+from similarity import describe_rows, top_scores, fuse_scores, batch_top_k
+from keyword_index import KeywordIndex, analyze
+from query_cache import QueryEmbeddingCache, query_key
+from partitions import NO_FILTERS, SearchFilters, parse_filters
+from result_cache import ResultCache
+from jobs import JobManager, JobQueueFull, JobStore
+from artifact_cache import TextArtifacts
+from upload_buffer import MemoryBudget, UploadBuffer
+from pdf_text import PageExtractor
+from openai_client import create_client, ResourceCache, count_round_trips, poll_run
+from thread_registry import ThreadRegistry
+from tool_runner import ToolPool
+from assistant_tools import ASSISTANT_ID
+import metrics
+from metrics import span
 
 
 app = Flask(__name__)
@@ -23,8 +42,74 @@ app = Flask(__name__)
 UPLOAD_FOLDER = 'temp'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Uploads up to this size stay in memory; larger ones spill to UPLOAD_FOLDER
+UPLOAD_SPOOL_BYTES = int(os.environ.get('RFP_UPLOAD_SPOOL_BYTES', 8 * 1024 * 1024))
+# All uploads held in memory at once (queued and running jobs, batch files); beyond
+# this, further uploads are written to UPLOAD_FOLDER like oversized ones
+upload_memory = MemoryBudget(int(os.environ.get('RFP_UPLOAD_MEMORY_BYTES', 256 * 1024 * 1024)))
+
+VECTOR_STORE_ID = 'vs_qUspcB7VllWXM4z7aAEdIK9L'
+
 EMBEDDINGS_DIR = 'temp2'
-EMBEDDINGS_FILE = os.path.join(EMBEDDINGS_DIR, 'embeddings.json')
+os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
+
+# Threads and job states live here so every worker process can serve them
+STATE_DB = os.environ.get('RFP_THREADS_DB', os.path.join(EMBEDDINGS_DIR, 'threads.db'))
+
+# Uploads are ingested on a bounded pool of background workers
+INGEST_WORKERS = int(os.environ.get('RFP_INGEST_WORKERS', 2))
+INGEST_MAX_PENDING = int(os.environ.get('RFP_INGEST_MAX_PENDING', 100))
+JOB_RETENTION_HOURS = float(os.environ.get('RFP_JOB_RETENTION_HOURS', 168))  # Finished jobs kept this long
+job_store = JobStore(STATE_DB, retention_seconds=JOB_RETENTION_HOURS * 3600)
+# Jobs of processes that exited mid-job (e.g. a restart) would otherwise stay "running"
+job_store.fail_orphaned()
+job_store.prune()
+ingestion_jobs = JobManager(max_workers=INGEST_WORKERS, max_pending=INGEST_MAX_PENDING,
+                            store=job_store)
+
+# Each running job uploads to the vector store here while it extracts and encodes
+vector_store_uploads = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix='vs-upload')
+EMBEDDINGS_FILE = os.path.join(EMBEDDINGS_DIR, 'embeddings.json')  # Legacy JSON store
+
+# Binary embedding store; imports the legacy embeddings.json once if it is still there
+embedding_store = EmbeddingStore(EMBEDDINGS_DIR)
+embedding_store.migrate_json(EMBEDDINGS_FILE)
+
+# Extracted text of every ingested PDF, keyed by content hash
+text_artifacts = TextArtifacts(os.path.join(EMBEDDINGS_DIR, 'texts'))
+
+# Page-parallel PDF text extraction (RFP_PDF_WORKERS processes); in-memory uploads
+# split across the pool are written to UPLOAD_FOLDER for it
+pdf_extractor = PageExtractor(spill_directory=UPLOAD_FOLDER)
+
+# Content hashes of uploads currently being ingested -> job id
+inflight_hashes = {}
+inflight_lock = threading.Lock()
+
+# Normalized embedding matrix kept resident for ir_stuff; reloads only new rows.
+# RFP_INDEX_PRECISION=float16/int8 keeps quantized codes instead (see quantization.py)
+index_cache = IndexCache(embedding_store)
+
+# Recent ir_stuff results by (title, filters); dropped whenever the corpus grows
+ir_results = ResultCache(max_entries=int(os.environ.get('RFP_RESULT_CACHE_SIZE', 1024)))
+
+# Persisted HNSW index used by ir_stuff once the corpus is large enough
+ann_index = AnnIndex(os.path.join(EMBEDDINGS_DIR, 'ann.hnsw'))
+ann_index.load(len(embedding_store))
+
+# Embeddings of recent free-text queries, so repeated questions skip the model
+query_embeddings = QueryEmbeddingCache(max_entries=int(os.environ.get('RFP_QUERY_CACHE_SIZE', 4096)))
+
+# Most query documents a single ir_stuff_batch call may compare
+BATCH_MAX_QUERIES = int(os.environ.get('RFP_BATCH_MAX_QUERIES', 200))
+
+# BM25 index over the extracted text of stored documents, row for row
+keyword_index = KeywordIndex(os.path.join(EMBEDDINGS_DIR, 'keywords'))
+
+# Hybrid keyword search: candidates taken from each retriever, and the weight
+# of embedding similarity (vs. BM25) in the fused score
+HYBRID_CANDIDATES = int(os.environ.get('RFP_HYBRID_CANDIDATES', 100))
+HYBRID_ALPHA = float(os.environ.get('RFP_HYBRID_ALPHA', 0.5))
 
 
 def sanitize_filename(filename):
@@ -34,10 +119,118 @@ def sanitize_filename(filename):
     return os.path.basename(filename)
 
 
-threads = {}  # Dictionary to store thread instances with their names
+# Thread ids and names, shared by all worker processes through SQLite
+threads = ThreadRegistry(STATE_DB)
 
-# Initialize OpenAI client at the global scope
-client = OpenAI()
+# Initialize OpenAI client at the global scope, on a pooled keep-alive connection pool
+client = create_client(
+    max_connections=int(os.environ.get('RFP_OPENAI_MAX_CONNECTIONS', 20)))
+
+# Assistant and vector store objects, fetched once per TTL instead of per request
+openai_resources = ResourceCache(ttl=float(os.environ.get('RFP_OPENAI_RESOURCE_TTL_SECONDS', 600)))
+
+# Adaptive run polling: first retry after POLL_INITIAL_SECONDS, backing off to POLL_MAX_SECONDS
+POLL_INITIAL_SECONDS = float(os.environ.get('RFP_POLL_INITIAL_SECONDS', 0.1))
+POLL_MAX_SECONDS = float(os.environ.get('RFP_POLL_MAX_SECONDS', 2.0))
+
+
+def warm_start():
+    """
+    Load the embedding model and bring the ANN and keyword indexes up to date with the store.
+    """
+    warm_up()
+    ann_index.sync(index_cache.snapshot())
+    backfill_keyword_index()
+
+
+def backfill_keyword_index(batch_size=1000):
+    """
+    Add stored documents the keyword index is missing, from their cached text.
+    Documents whose text was never cached (e.g. imported from embeddings.json)
+    are left out.
+    """
+    records = embedding_store.records
+    documents = []
+    for row in keyword_index.missing_rows(len(records)):
+        content_hash = records[row].get('metadata', {}).get('sha256')
+        text = text_artifacts.load(content_hash) if content_hash else None
+        if text:
+            documents.append((int(row), analyze(text)))
+        if len(documents) >= batch_size:
+            keyword_index.add(documents)
+            documents = []
+    keyword_index.add(documents)
+
+
+# Warm up in the background so the first request does not pay for it;
+# /ready reports when the model is available. wsgi.py joins this thread so a
+# pre-forking server only forks once everything is loaded.
+warm_start_thread = threading.Thread(target=warm_start, daemon=True)
+warm_start_thread.start()
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_time(response):
+    # Label by route pattern, not path, so ids do not create new series
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - g.request_start,
+                                    endpoint, request.method, response.status_code)
+    return response
+
+
+# Values other components already track, read when /metrics is scraped
+metrics.REGISTRY.collect('rfp_corpus_documents', 'Documents in the embedding store',
+                         lambda: len(embedding_store))
+metrics.REGISTRY.collect('rfp_ann_index_rows', 'Rows in the HNSW index', lambda: ann_index.size)
+metrics.REGISTRY.collect('rfp_model_ready', 'Whether the embedding model is loaded',
+                         lambda: int(is_ready()))
+metrics.REGISTRY.collect('rfp_inflight_uploads', 'Uploads being ingested, by content hash',
+                         lambda: len(inflight_hashes))
+metrics.REGISTRY.collect('rfp_index_cache_rows', 'Rows resident in the index cache',
+                         lambda: index_cache.stats()["rows"])
+metrics.REGISTRY.collect('rfp_index_cache_lookups_total', 'Index cache lookups by result',
+                         lambda: {("hit",): index_cache.hits, ("miss",): index_cache.misses},
+                         labelnames=('result',), type='counter')
+metrics.REGISTRY.collect('rfp_index_cache_reload_seconds_total', 'Time spent loading new rows',
+                         lambda: index_cache.total_reload_seconds, type='counter')
+metrics.REGISTRY.collect('rfp_index_cache_vector_bytes', 'Bytes of resident search vectors',
+                         index_cache.vector_bytes)
+metrics.REGISTRY.collect('rfp_result_cache_entries', 'Entries in the ir_stuff result cache',
+                         lambda: ir_results.stats()["entries"])
+metrics.REGISTRY.collect('rfp_result_cache_lookups_total', 'ir_stuff result cache lookups by result',
+                         lambda: {("hit",): ir_results.hits, ("miss",): ir_results.misses},
+                         labelnames=('result',), type='counter')
+metrics.REGISTRY.collect('rfp_result_cache_invalidations_total',
+                         'Result cache flushes caused by corpus growth',
+                         lambda: ir_results.invalidations, type='counter')
+metrics.REGISTRY.collect('rfp_query_embedding_cache_lookups_total',
+                         'Query embedding cache lookups by result',
+                         lambda: {("hit",): query_embeddings.hits, ("miss",): query_embeddings.misses},
+                         labelnames=('result',), type='counter')
+metrics.REGISTRY.collect('rfp_upload_memory_bytes', 'Upload bytes held in memory', lambda: upload_memory.used)
+metrics.REGISTRY.collect('rfp_upload_memory_spills_total', 'Uploads written to disk because the memory budget was used up',
+                         lambda: upload_memory.spills, type='counter')
+metrics.REGISTRY.collect('rfp_tool_calls_pending', 'Tool calls queued or running', lambda: tool_pool.pending)
+metrics.REGISTRY.collect('rfp_tool_calls_rejected_total', 'Tool calls rejected because the pool was full',
+                         lambda: tool_pool.rejected, type='counter')
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Per process: with several workers, each scrape reaches one of them
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    if is_ready():
+        return jsonify({"ready": True, **model_status()}), 200
+    return jsonify({"ready": False}), 503
 
 
 @app.route('/uploadFile', methods=['POST'])
@@ -58,147 +251,462 @@ def upload_file():
 
     # Sanitize filename
     sanitized_filename = sanitize_filename(file.filename)
-    temp_path = os.path.join(UPLOAD_FOLDER, sanitized_filename)
 
+    upload = None
     try:
+        # Buffer the upload (hashing it on the way); the request stream closes once we return
+        with span('upload', 'receive'):
+            upload = UploadBuffer.from_stream(file.stream, sanitized_filename,
+                                              UPLOAD_FOLDER, UPLOAD_SPOOL_BYTES, upload_memory)
+
+        # Identical content was already ingested (or is being ingested): reuse it
+        duplicate = claim_content_hash(upload.sha256)
+        if duplicate is not None:
+            upload.close()
+            status_code = duplicate.pop("status_code")
+            return jsonify(duplicate), status_code
+
+        try:
+            job = ingestion_jobs.submit('upload', ingest_file, upload,
+                                        description=sanitized_filename)
+        except Exception:
+            release_content_hashes([upload.sha256])
+            raise
+        record_inflight_job([upload.sha256], job.id)
+    except JobQueueFull as e:
+        upload.close()
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        if upload is not None:
+            upload.close()
+        return jsonify({"error": str(e)}), 500
+
+    # Ingestion continues in the background; clients poll /jobs/<job_id>
+    return jsonify({
+        "response": "File accepted for processing.",
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}"
+    }), 202
 
-        # Save the uploaded file temporarily
-        file.save(temp_path)
 
-        with open(temp_path, "rb") as f:
+def claim_content_hash(content_hash):
+    """
+    Check whether content with this hash is already stored or being ingested.
+
+    Returns a response body (with its "status_code") for duplicates; otherwise
+    marks the hash as in flight and returns None.
+    """
+    # Pick up documents stored by other processes before deciding
+    index_cache.snapshot()
+    row = embedding_store.row_for_hash(content_hash)
+    if row is not None:
+        return {
+            "response": "File already uploaded.",
+            "doc_id": embedding_store.records[row]["doc_id"],
+            "duplicate": True,
+            "status_code": 200
+        }
+
+    with inflight_lock:
+        if content_hash in inflight_hashes:
+            duplicate = {
+                "response": "File is already being processed.",
+                "duplicate": True,
+                "status_code": 202
+            }
+            # The job id is only known once the claiming request has submitted its job
+            job_id = inflight_hashes[content_hash]
+            if job_id is not None:
+                duplicate["job_id"] = job_id
+                duplicate["status_url"] = f"/jobs/{job_id}"
+            return duplicate
+        inflight_hashes[content_hash] = None
+    return None
+
+
+def record_inflight_job(content_hashes, job_id):
+    with inflight_lock:
+        for content_hash in content_hashes:
+            # The job may already have finished and released its hashes
+            if content_hash in inflight_hashes:
+                inflight_hashes[content_hash] = job_id
+
+
+def release_content_hashes(content_hashes):
+    with inflight_lock:
+        for content_hash in content_hashes:
+            inflight_hashes.pop(content_hash, None)
+
+
+def load_or_extract_text(upload, stage=None):
+    """
+    Return the text of a PDF, reusing the cached extraction for identical content.
+
+    Parameters:
+    - stage: optional job stage info that per-page timings are added to
+    """
+    text = text_artifacts.load(upload.sha256)
+    if text is None:
+        text, page_seconds = extract_pdf_text(upload.source())
+        if stage is not None:
+            stage["pages"] = stage.get("pages", 0) + len(page_seconds)
+            stage.setdefault("page_seconds", []).extend(round(seconds, 4) for seconds in page_seconds)
+        if text:
+            text_artifacts.save(upload.sha256, text)
+    elif stage is not None:
+        stage["cached"] = stage.get("cached", 0) + 1
+    return text
+
+
+def ingest_file(job, upload):
+    """
+    Background ingestion of one uploaded PDF: vector store upload, text
+    extraction, embedding and storage. The upload runs concurrently with
+    extraction and encoding. Each step is recorded as a job stage.
+
+    Parameters:
+    - job: the Job tracking this upload
+    - upload: UploadBuffer holding the PDF, read by both the vector store upload and the extractor
+    """
+    try:
+        # The upload waits on the network while extraction and encoding use the CPU
+        vector_store_upload = vector_store_uploads.submit(upload_to_vector_store, job, [upload])
+        local_error = None
+        try:
+            # Extract text from PDF using pdfplumber
+            with job.stage('extract_text') as stage:
+                text = load_or_extract_text(upload, stage)
+
+                if not text:
+                    raise ValueError("No extractable text found in the PDF.")
+
+            with job.stage('analyze_keywords'):
+                terms = analyze(text)
+
+            # Use the shared model loaded at startup
+            with job.stage('load_model'):
+                model = get_model()
+
+            # Generate embedding for the extracted text
+            with job.stage('encode'):
+                embedding = model.encode(text)
+        except Exception as e:
+            local_error = e
+
+        # Only store the embedding once the document is in the vector store too
+        join_upload(vector_store_upload, local_error)
+
+        metadata = build_metadata(upload.filename, upload.sha256)
+        doc_id = metadata["doc_id"]
+
+        # Append the new document's embedding and metadata to the store
+        with job.stage('store_embedding'):
+            row = embedding_store.append(metadata["doc_id"], embedding, metadata)
+
+        with job.stage('update_index'):
+            index_cache.refresh()
+            ann_index.sync(index_cache.snapshot())
+
+        with job.stage('keyword_index'):
+            keyword_index.add([(row, terms)])
+
+        return {"doc_id": doc_id, "response": "File uploaded and embeddings stored successfully."}
+
+    except OpenAIError as e:
+        if isinstance(e, NotFoundError):
+            # The cached vector store may have been deleted or replaced
+            openai_resources.invalidate('vector_store')
+        raise RuntimeError(f"OpenAI Error: {str(e)}") from e
+    finally:
+        release_content_hashes([upload.sha256])
+        # Free the buffer (or its spill file) after processing
+        upload.close()
+
+
+def upload_to_vector_store(job, uploads):
+    """
+    Upload files to the vector store as one file batch and wait until they are
+    indexed. Runs on vector_store_uploads, concurrently with the job's local work.
+
+    Returns the completed file batch.
+    """
+    with job.stage('vector_store_upload'):
+        # Each file gets its own reader over the shared buffer, under its original name
+        handles = [upload.open() for upload in uploads]
+        try:
             file_batch = client.beta.vector_stores.file_batches.upload_and_poll(
-                vector_store_id='vs_qUspcB7VllWXM4z7aAEdIK9L', files=[f]
+                vector_store_id=get_vector_store().id,
+                files=[(upload.filename, f) for upload, f in zip(uploads, handles)]
             )
+        finally:
+            for f in handles:
+                f.close()
 
         # Check upload status
         if file_batch.status != "completed":
-            return jsonify({"error": "File upload to vector store failed"}), 500
+            raise RuntimeError("File upload to vector store failed")
+        return file_batch
 
-        # **Proceed with embedding extraction and storage**
 
-        # Extract text from PDF using pdfplumber
-        with pdfplumber.open(temp_path) as pdf:
-            pages = pdf.pages
-            text = '\n'.join([page.extract_text()
-                             for page in pages if page.extract_text()])
+def join_upload(upload, local_error=None):
+    """
+    Wait for a concurrent vector store upload and fail if either it or the
+    local extraction/encoding failed; one error describes both when both did.
 
-        if not text:
-            return jsonify({"error": "No extractable text found in the PDF."}), 400
+    Returns the upload's file batch.
+    """
+    try:
+        file_batch = upload.result()
+    except Exception as upload_error:
+        if local_error is None:
+            raise
+        raise RuntimeError(f"Vector store upload failed: {str(upload_error)}; "
+                           f"local processing failed: {str(local_error)}") from upload_error
+    if local_error is not None:
+        raise local_error
+    return file_batch
+
+
+def extract_pdf_text(path):
+    """
+    Extract the text of every page of a PDF with pdfplumber, once per page and
+    across the extraction pool for large documents.
 
-        # Choose an appropriate model
-        model = SentenceTransformer('all-MiniLM-L6-v2')
+    Returns (text, seconds spent on each page).
+    """
+    return pdf_extractor.extract(path)
 
-        # Generate embedding for the extracted text
-        # Convert numpy array to list for JSON serialization
-        embedding = model.encode(text).tolist()
 
-        # **Handle the 'category' field**
-        # Example: Extract category from filename assuming format "Category_DocumentName.pdf"
-        # Adjust the logic based on your actual filename structure or data source
+def build_metadata(sanitized_filename, content_hash):
+    """
+    Build the stored metadata of an uploaded document from its file name.
+    """
+    # **Handle the 'category' field**
+    # Example: Extract category from filename assuming format "Category_DocumentName.pdf"
+    # Adjust the logic based on your actual filename structure or data source
+    try:
+        category = sanitized_filename.split('_')[0]  # Example extraction
+    except IndexError:
+        category = "Uncategorized"
+
+    # Prepare metadata
+    doc_id = sanitized_filename
+    return {
+        "category": category,
+        "doc_id": doc_id,
+        "file_path": os.path.abspath(os.path.join(UPLOAD_FOLDER, sanitized_filename)),
+        "title": os.path.splitext(sanitized_filename)[0],
+        "upload_time": datetime.utcnow().isoformat(),
+        "sha256": content_hash
+        # Add more metadata fields as needed
+    }
+
+
+@app.route('/uploadFiles', methods=['POST'])
+def upload_files():
+    """
+    Batch variant of /uploadFile for backfills: accepts many PDFs under the
+    'files' field and ingests them as one job.
+    """
+    files = request.files.getlist('files')
+    if not files:
+        return jsonify({"error": "No files part in the request"}), 400
+
+    accepted = []
+    rejected = []
+    duplicates = []
+    for file in files:
+        if file.filename == '':
+            rejected.append({"filename": file.filename, "error": "No selected file"})
+            continue
+        if not file.filename.lower().endswith('.pdf'):
+            rejected.append({"filename": file.filename, "error": "Only PDF files are allowed"})
+            continue
+
+        sanitized_filename = sanitize_filename(file.filename)
         try:
-            category = sanitized_filename.split('_')[0]  # Example extraction
-        except IndexError:
-            category = "Uncategorized"
-
-        # Prepare metadata
-        doc_id = sanitized_filename
-        metadata = {
-            "category": category,
-            "doc_id": doc_id,
-            "file_path": os.path.abspath(temp_path),
-            "title": os.path.splitext(sanitized_filename)[0],
-            "upload_time": datetime.utcnow().isoformat()
-            # Add more metadata fields as needed
-        }
-
-        # Load existing embeddings.json or initialize an empty list
-        if os.path.exists(EMBEDDINGS_FILE):
-            with open(EMBEDDINGS_FILE, 'r') as f:
-                embeddings_data = json.load(f)
-        else:
-            embeddings_data = []
-
-        # Append the new document's embedding and metadata
-        embeddings_data.append({
-            "doc_id": metadata["doc_id"],
-            "embedding": embedding,
-            "metadata": metadata
-        })
+            with span('batch_upload', 'receive'):
+                upload = UploadBuffer.from_stream(file.stream, sanitized_filename,
+                                                  UPLOAD_FOLDER, UPLOAD_SPOOL_BYTES, upload_memory)
+        except Exception as e:
+            rejected.append({"filename": file.filename, "error": str(e)})
+            continue
+
+        # Skip content that is stored, in flight, or repeated within this batch
+        duplicate = claim_content_hash(upload.sha256)
+        if duplicate is not None:
+            upload.close()
+            duplicate.pop("status_code")
+            duplicates.append({"filename": sanitized_filename, **duplicate})
+            continue
+        accepted.append(upload)
+
+    if not accepted:
+        if duplicates:
+            return jsonify({"response": "All files were already uploaded.",
+                            "duplicates": duplicates, "rejected": rejected}), 200
+        return jsonify({"error": "No valid PDF files in the request", "rejected": rejected}), 400
 
-        # Save back to embeddings.json
-        with open(EMBEDDINGS_FILE, 'w') as f:
-            json.dump(embeddings_data, f, indent=4)
+    try:
+        job = ingestion_jobs.submit('batch_upload', ingest_batch, accepted,
+                                    description=f"{len(accepted)} files")
+    except JobQueueFull as e:
+        release_content_hashes([upload.sha256 for upload in accepted])
+        for upload in accepted:
+            upload.close()
+        return jsonify({"error": str(e)}), 503
+
+    record_inflight_job([upload.sha256 for upload in accepted], job.id)
+
+    return jsonify({
+        "response": f"{len(accepted)} files accepted for processing.",
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}",
+        "rejected": rejected,
+        "duplicates": duplicates
+    }), 202
+
+
+def ingest_batch(job, items):
+    """
+    Background ingestion of several PDFs: one vector store file batch, one
+    batched encode call and one store commit for the whole set.
 
-        # Clean up the temporary file after processing
-        os.remove(temp_path)
+    Parameters:
+    - job: the Job tracking this batch
+    - items: list of UploadBuffers, one per PDF
 
-        # **Final Response after all processing is done**
-        return jsonify({"response": "File uploaded and embeddings stored successfully."}), 200
+    Returns per-file results; a file that fails extraction does not fail the batch.
+    """
+    results = [{"filename": upload.filename} for upload in items]
+    try:
+        # The upload waits on the network while extraction and encoding use the CPU
+        vector_store_upload = vector_store_uploads.submit(upload_to_vector_store, job, items)
+        local_error = None
+        documents = []
+        try:
+            with job.stage('extract_text') as stage:
+                texts = []
+                for i, upload in enumerate(items):
+                    try:
+                        text = load_or_extract_text(upload, stage)
+                    except Exception as e:
+                        results[i]["error"] = f"Text extraction failed: {str(e)}"
+                        continue
+                    if not text:
+                        results[i]["error"] = "No extractable text found in the PDF."
+                        continue
+                    texts.append(text)
+                    documents.append(i)
+
+            with job.stage('analyze_keywords'):
+                terms = [analyze(text) for text in texts]
+
+            if documents:
+                with job.stage('load_model'):
+                    model = get_model()
+
+                # One batched call instead of one encode per document
+                with job.stage('encode'):
+                    embeddings = model.encode(texts)
+        except Exception as e:
+            local_error = e
+
+        # Only store embeddings once the files are in the vector store too
+        file_batch = join_upload(vector_store_upload, local_error)
+
+        if documents:
+            with job.stage('store_embedding'):
+                entries = []
+                for i, embedding in zip(documents, embeddings):
+                    metadata = build_metadata(items[i].filename, items[i].sha256)
+                    entries.append((metadata["doc_id"], embedding, metadata))
+                rows = embedding_store.append_many(entries)
+
+            with job.stage('update_index'):
+                index_cache.refresh()
+                ann_index.sync(index_cache.snapshot())
+
+            with job.stage('keyword_index'):
+                keyword_index.add(list(zip(rows, terms)))
+
+            for i in documents:
+                results[i]["doc_id"] = items[i].filename
+                results[i]["status"] = "stored"
+
+        for result in results:
+            result.setdefault("status", "failed")
+
+        file_counts = file_batch.file_counts
+        return {
+            "files": results,
+            "stored": len(documents),
+            "failed": len(items) - len(documents),
+            "vector_store": {"completed": file_counts.completed, "failed": file_counts.failed}
+        }
 
     except OpenAIError as e:
-        return jsonify({"error": f"OpenAI Error: {str(e)}"}), 500
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        if isinstance(e, NotFoundError):
+            # The cached vector store may have been deleted or replaced
+            openai_resources.invalidate('vector_store')
+        raise RuntimeError(f"OpenAI Error: {str(e)}") from e
+    finally:
+        release_content_hashes([upload.sha256 for upload in items])
+        for upload in items:
+            upload.close()
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    status = ingestion_jobs.status(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(status), 200
 
 
-def ir_stuff(filename, K):
+def ir_stuff(filename, K, filters=NO_FILTERS):
     """
-    Find similar documents using pre-computed embeddings from embeddings.json
+    Find similar documents using pre-computed embeddings from the embedding store
 
     Parameters:
     - filename: the file name of the query document in the format "Category\\DocumentName.pdf"
     - K: optional, the number of similar documents to return (default is 5)
+    - filters: optional SearchFilters; only documents of the matching categories and
+      upload times are scored
     """
     try:
 
-        # Define paths
-        TEMP2_DIR = 'temp2'
-        EMBEDDINGS_FILE = os.path.join(TEMP2_DIR, 'embeddings.json')
+        # Resident index; only rows added since the last call are loaded
+        with span('ir_stuff', 'snapshot'):
+            index = index_cache.snapshot()
 
-        # Load pre-computed embeddings
-        if not os.path.exists(EMBEDDINGS_FILE):
+        if index.count == 0:
             return jsonify({"error": "Embeddings file not found"}), 404
 
-        with open(EMBEDDINGS_FILE, 'r') as f:
-            all_embeddings = json.load(f)
+        # The row count identifies the corpus version: the store is append-only
+        cache_key = (filename, filters)
+        cached = ir_results.get(cache_key, K, index.count)
+        if cached is not None:
+            return jsonify(cached), 200
 
-        # Find the query document embedding from embeddings.json
-        query_embedding = None
-        for doc in all_embeddings:
-            if doc['metadata']["title"] == filename:
-                query_embedding = np.array(doc['embedding'])
-                break
+        records = index.records
+        matrix = index.matrix
 
-        if query_embedding is None:
+        # Find the query document embedding through the title index
+        query_row = index.title_index.get(filename)
+        if query_row is None or query_row >= index.count:
             return jsonify({"error": "Query document not found in embeddings"}), 404
 
-        # Calculate cosine similarities
-        similarities = []
-        for doc in all_embeddings:
-            if doc['doc_id'] == filename:
-                continue  # Skip the query document itself
-            doc_embedding = np.array(doc['embedding'])
-            similarity = cosine_similarity(
-                query_embedding.reshape(1, -1),
-                doc_embedding.reshape(1, -1)
-            )[0][0]
-
-            doc_metadata = doc.get('metadata', {})
-            category = doc_metadata.get('category', 'Unknown')
-            file_path = doc_metadata.get('file_path', 'N/A')
-            title = doc_metadata.get('title', 'Untitled')
-
-            similarities.append({
-                'doc_id': doc['doc_id'],
-                'similarity': float(similarity),
-                'category': category,
-                'file_path': file_path,
-                'title': title
-            })
-
-        # Sort by similarity in descending order
-        similarities.sort(key=lambda x: x['similarity'], reverse=True)
-        top_similar = similarities[:K]
+        # Approximate search on large corpora, exact below the ANN threshold; skip the
+        # query itself, including re-uploads under the same title
+        with span('ir_stuff', 'search'):
+            # Filtered searches only touch the rows of the matching partitions
+            candidate_rows = index.partitions.select(filters, index.count)
+            rows, scores = ann_index.search(index, matrix[query_row], K,
+                                            exclude_rows=title_rows(index, filename),
+                                            rows=candidate_rows)
+        top_similar = describe_rows(records, rows, scores)
+        ir_results.put(cache_key, K, index.count, top_similar)
 
         # Return top K most similar documents
         return jsonify(top_similar), 200
@@ -207,12 +715,235 @@ def ir_stuff(filename, K):
         return jsonify({"error": str(e)}), 500
 
 
+def title_rows(index, title):
+    """
+    Rows of every copy of a document title in an IndexSnapshot.
+    """
+    return [row for row in index.title_rows.get(title, ()) if row < index.count]
+
+
+def ir_stuff_batch(filenames, K, filters=NO_FILTERS, query_category=None):
+    """
+    Find similar documents for several query documents at once, with one
+    matrix-matrix product per block of queries instead of one scan each.
+    Results are exact and shared with ir_stuff through the result cache.
+
+    Parameters:
+    - filenames: titles of the query documents
+    - K: the number of similar documents to return per query
+    - filters: optional SearchFilters restricting the similar documents
+    - query_category: optional; every document of this category is a query too
+    """
+    try:
+        with span('ir_stuff_batch', 'snapshot'):
+            index = index_cache.snapshot()
+
+        if index.count == 0:
+            return jsonify({"error": "Embeddings file not found"}), 404
+
+        titles = list(filenames)
+        if query_category is not None:
+            category_rows = index.partitions.select(SearchFilters((query_category,), None, None), index.count)
+            titles.extend(index.records[row].get('metadata', {}).get('title') for row in category_rows)
+        titles = list(dict.fromkeys(title for title in titles if title is not None))
+        if not titles:
+            return jsonify({"error": "No query documents given"}), 400
+        if len(titles) > BATCH_MAX_QUERIES:
+            return jsonify({"error": f"{len(titles)} query documents; at most "
+                                     f"{BATCH_MAX_QUERIES} can be compared in one call"}), 400
+
+        found = {}
+        missing = []
+        pending = []  # (title, row) of queries not in the result cache
+        for title in titles:
+            cached = ir_results.get((title, filters), K, index.count)
+            if cached is not None:
+                found[title] = cached
+                continue
+            query_row = index.title_index.get(title)
+            if query_row is None or query_row >= index.count:
+                missing.append(title)
+            else:
+                pending.append((title, query_row))
+
+        if pending:
+            # Other copies of a query's title are dropped afterwards; ask for enough extra rows
+            copies = {title: title_rows(index, title) for title, _ in pending}
+            extra = max(len(rows) for rows in copies.values()) - 1
+            with span('ir_stuff_batch', 'search'):
+                candidate_rows = index.partitions.select(filters, index.count)
+                neighbours = batch_top_k(index.matrix, [row for _, row in pending], K + extra,
+                                         rows=candidate_rows)
+            for (title, _), (rows, scores) in zip(pending, neighbours):
+                keep = ~np.isin(rows, copies[title])
+                rows, scores = rows[keep][:K], scores[keep][:K]
+                found[title] = describe_rows(index.records, rows, scores)
+                ir_results.put((title, filters), K, index.count, found[title])
+
+        results = [{"filename": title, "similar": found[title]} for title in titles if title in found]
+        return jsonify({"results": results, "missing": missing}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def read_batch_args(args):
+    """
+    Validate ir_stuff_batch arguments from a request body or tool call.
+    Returns (keyword arguments for ir_stuff_batch, error message or None).
+    """
+    filenames = args.get("filenames", [])
+    if not isinstance(filenames, list) or not all(isinstance(name, str) for name in filenames):
+        return None, "filenames must be a list of document titles."
+    query_category = args.get("query_category")
+    if query_category is not None and not isinstance(query_category, str):
+        return None, "query_category must be a string."
+    if not filenames and query_category is None:
+        return None, "Give filenames, a query_category, or both."
+
+    k = read_k(args)
+    if k is None:
+        return None, "Invalid value for K. It must be a positive integer."
+
+    try:
+        filters = parse_filters(args)
+    except ValueError as e:
+        return None, str(e)
+    return {"filenames": filenames, "K": k, "filters": filters, "query_category": query_category}, None
+
+
+@app.route('/irStuffBatch', methods=['POST'])
+def ir_stuff_batch_endpoint():
+    """
+    Similar documents for many query documents in one call.
+
+    Body: {"filenames": [...], "query_category": ..., "k": 5, plus the ir_stuff filters}
+    """
+    call, error = read_batch_args(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({"error": error}), 400
+    return ir_stuff_batch(**call)
+
+
+def semantic_search(query, K, filters=NO_FILTERS):
+    """
+    Find the documents closest in meaning to a free-text query, using the
+    local embedding model and index only (no OpenAI request).
+
+    Parameters:
+    - query: the question or description to search for
+    - K: the number of documents to return
+    - filters: optional SearchFilters, as for ir_stuff
+    """
+    try:
+        with span('semantic_search', 'snapshot'):
+            index = index_cache.snapshot()
+
+        if index.count == 0:
+            return jsonify({"error": "Embeddings file not found"}), 404
+
+        # Same result cache as ir_stuff; a tuple key cannot collide with a title
+        cache_key = (('semantic', query_key(query)), filters)
+        cached = ir_results.get(cache_key, K, index.count)
+        if cached is not None:
+            return jsonify(cached), 200
+
+        with span('semantic_search', 'encode'):
+            query_vector = query_embeddings.get(query, get_model().encode)
+
+        with span('semantic_search', 'search'):
+            candidate_rows = index.partitions.select(filters, index.count)
+            rows, scores = ann_index.search(index, query_vector, K, rows=candidate_rows)
+        results = describe_rows(index.records, rows, scores)
+        ir_results.put(cache_key, K, index.count, results)
+        return jsonify(results), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/semanticSearch', methods=['POST'])
+def semantic_search_endpoint():
+    """
+    Body: {"query": ..., "k": 5, plus the ir_stuff filters}
+    """
+    result = read_query_args(request.get_json(silent=True) or {})
+    if isinstance(result, str):
+        return jsonify({"error": result}), 400
+    return semantic_search(*result)
+
+
+def keyword_search(query, K, filters=NO_FILTERS, mode='hybrid'):
+    """
+    Find documents matching a free-text query by BM25 over their extracted text,
+    optionally fused with embedding similarity to the query.
+
+    Parameters:
+    - query: the query text, e.g. a clause number, product or province name
+    - K: the number of documents to return
+    - filters: optional SearchFilters, as for ir_stuff
+    - mode: 'bm25' for keyword scores only, 'hybrid' to fuse them with embedding similarity
+    """
+    try:
+        with span('keyword_search', 'snapshot'):
+            index = index_cache.snapshot()
+            view = keyword_index.snapshot()
+
+        if index.count == 0:
+            return jsonify({"error": "Embeddings file not found"}), 404
+
+        candidate_rows = index.partitions.select(filters, index.count)
+
+        with span('keyword_search', 'bm25'):
+            # Scores by embedding store row; rows the keyword index has not seen score 0
+            lexical = np.zeros(index.count, dtype=np.float32)
+            scores = keyword_index.scores(query, view)[:index.count]
+            lexical[:len(scores)] = scores
+
+        if mode == 'bm25':
+            rows, scores = top_scores(lexical, K, candidate_rows)
+            return jsonify(describe_rows(index.records, rows, scores, score_key='score')), 200
+
+        # Hybrid: the best candidates of each retriever, rescored by both
+        lexical_rows, _ = top_scores(lexical, HYBRID_CANDIDATES, candidate_rows)
+        with span('keyword_search', 'encode'):
+            query_vector = query_embeddings.get(query, get_model().encode)
+        with span('keyword_search', 'vector'):
+            vector_rows, _ = ann_index.search(index, query_vector, HYBRID_CANDIDATES, rows=candidate_rows)
+        rows = np.union1d(lexical_rows, vector_rows).astype(np.int64)
+        if len(rows) == 0:
+            return jsonify([]), 200
+
+        semantic = index.matrix[rows] @ query_vector
+        fused = fuse_scores(lexical[rows], semantic, HYBRID_ALPHA)
+        order = np.argsort(-fused, kind='stable')[:K]
+        results = describe_rows(index.records, rows[order], fused[order], score_key='score')
+        for result, row in zip(results, rows[order]):
+            result['bm25'] = float(lexical[row])
+            result['similarity'] = float(semantic[np.searchsorted(rows, row)])
+        return jsonify(results), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/indexStats', methods=['GET'])
+def index_stats():
+    # Cache hit/miss counters and reload times of the resident embedding index
+    stats = index_cache.stats()
+    stats["ann_rows"] = ann_index.size
+    stats["result_cache"] = ir_results.stats()
+    stats["categories"] = embedding_store.partitions.counts()
+    stats["keyword_index"] = keyword_index.stats()
+    stats["query_embeddings"] = query_embeddings.stats()
+    return jsonify(stats), 200
+
+
 @app.route('/threads', methods=['GET', 'POST'])
 def manage_threads():
     if request.method == 'GET':
         # Return the list of threads with IDs and names
-        thread_list = [{'id': thread_id, 'name': info['name']}
-                       for thread_id, info in threads.items()]
+        thread_list = threads.list()
         return jsonify({"threads": thread_list}), 200
     elif request.method == 'POST':
         # Get thread name from request body
@@ -224,128 +955,392 @@ def manage_threads():
         # Create a new thread using the OpenAI API
         thread = client.beta.threads.create()
         # Store the thread along with its name
-        threads[thread.id] = {'thread': thread, 'name': thread_name}
+        threads.add(thread.id, thread_name)
         return jsonify({"thread_id": thread.id, "name": thread_name}), 201
 
 
 @app.route('/threads/<thread_id>', methods=['DELETE'])
 def delete_thread(thread_id):
-    if thread_id in threads:
-        del threads[thread_id]
+    if threads.delete(thread_id):
         return jsonify({"message": "Thread deleted"}), 200
     else:
         return jsonify({"error": "Thread not found"}), 404
 
 
-@app.route('/ask', methods=['POST'])
-def ask_question():
-    data = request.json
+def get_assistant():
+    return openai_resources.get(
+        'assistant', lambda: client.beta.assistants.retrieve(ASSISTANT_ID))
+
+
+def get_vector_store():
+    return openai_resources.get(
+        'vector_store', lambda: client.beta.vector_stores.retrieve(VECTOR_STORE_ID))
+
+
+def read_k(args):
+    """
+    The positive integer "k" of a tool call (default 5), or None if invalid.
+    """
+    try:
+        k = int(args.get("k", 5))
+    except (ValueError, TypeError):
+        return None
+    return k if k > 0 else None
+
+
+def run_ir_stuff_tool(args):
+    """
+    ir_stuff tool: validate the assistant's arguments and find similar documents.
+    """
+    filename = args.get("filename")
+
+    # Ensure K is an integer
+    k = read_k(args)
+    if k is None:
+        return {"error": "Invalid value for K. It must be a positive integer."}
+
+    try:
+        filters = parse_filters(args)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    # Call ir_stuff function; it builds Flask responses, so it needs an app context
+    with app.app_context():
+        response, status_code = ir_stuff(filename, k, filters)
+        if status_code == 200:
+            return response.json
+    return {"error": "Failed to find similar documents"}
+
+
+def run_ir_stuff_batch_tool(args):
+    """
+    ir_stuff_batch tool: validate the assistant's arguments and compare many documents at once.
+    """
+    call, error = read_batch_args(args)
+    if error:
+        return {"error": error}
+
+    with app.app_context():
+        response, status_code = ir_stuff_batch(**call)
+        # A 400 (e.g. too many query documents) tells the assistant what to change
+        if status_code in (200, 400):
+            return response.json
+    return {"error": "Failed to find similar documents"}
+
+
+def read_query_args(args):
+    """
+    Validate the query, k and filters of a free-text search.
+    Returns (query, k, filters), or an error message.
+    """
+    query = args.get("query")
+    if not isinstance(query, str) or not query.strip():
+        return "query must be a non-empty string."
+
+    k = read_k(args)
+    if k is None:
+        return "Invalid value for K. It must be a positive integer."
+
+    try:
+        filters = parse_filters(args)
+    except ValueError as e:
+        return str(e)
+    return query, k, filters
+
+
+def run_semantic_search_tool(args):
+    """
+    semantic_search tool: validate the assistant's arguments and search by meaning.
+    """
+    result = read_query_args(args)
+    if isinstance(result, str):
+        return {"error": result}
+
+    with app.app_context():
+        response, status_code = semantic_search(*result)
+        if status_code == 200:
+            return response.json
+    return {"error": "Failed to search documents"}
+
+
+def run_keyword_search_tool(args):
+    """
+    keyword_search tool: validate the assistant's arguments and search by keywords.
+    """
+    result = read_query_args(args)
+    if isinstance(result, str):
+        return {"error": result}
+    query, k, filters = result
+
+    mode = args.get("mode", "hybrid")
+    if mode not in ("bm25", "hybrid"):
+        return {"error": "mode must be 'bm25' or 'hybrid'."}
+
+    with app.app_context():
+        response, status_code = keyword_search(query, k, filters, mode)
+        if status_code == 200:
+            return response.json
+    return {"error": "Failed to search documents"}
+
+
+# Assistant tools by function name
+TOOL_HANDLERS = {
+    "ir_stuff": run_ir_stuff_tool,
+    "ir_stuff_batch": run_ir_stuff_batch_tool,
+    "keyword_search": run_keyword_search_tool,
+    "semantic_search": run_semantic_search_tool,
+}
+
+# Tool calls of one run execute concurrently on a bounded pool
+TOOL_WORKERS = int(os.environ.get('RFP_TOOL_WORKERS', 4))
+TOOL_TIMEOUT_SECONDS = float(os.environ.get('RFP_TOOL_TIMEOUT_SECONDS', 30))
+# Calls queued or running across all runs; beyond this, calls fail fast
+TOOL_MAX_PENDING = int(os.environ.get('RFP_TOOL_MAX_PENDING', 8 * TOOL_WORKERS))
+
+
+def call_tool(tool_call):
+    """
+    Run one tool call and return its output as a JSON string.
+    """
+    handler = TOOL_HANDLERS.get(tool_call.function.name)
+    if handler is None:
+        return json.dumps({"error": f"Unknown tool: {tool_call.function.name}"})
+
+    # Parse arguments
+    try:
+        args = json.loads(tool_call.function.arguments)
+    except json.JSONDecodeError as json_err:
+        return json.dumps({"error": "Invalid JSON arguments"})
+
+    with span('tool', tool_call.function.name):
+        return json.dumps(handler(args))
+
+
+# Each call's deadline starts when it starts running, not when it is queued
+tool_pool = ToolPool(call_tool, max_workers=TOOL_WORKERS, max_pending=TOOL_MAX_PENDING,
+                     timeout=TOOL_TIMEOUT_SECONDS)
+
+
+def handle_tool_calls(tool_calls):
+    """
+    Run the assistant's requested tool calls concurrently and build the outputs
+    to submit, in the order of the calls. A failing, slow or rejected call only
+    affects its own output.
+
+    Parameters:
+    - tool_calls: the tool calls from a run's required_action
+    """
+    tasks = [tool_pool.submit(tool_call) for tool_call in tool_calls]
+
+    tool_outputs = []
+    for task in tasks:
+        task.wait()
+        tool_outputs.append({
+            "tool_call_id": task.tool_call.id,
+            "output": task.output()
+        })
+
+    return tool_outputs
+
+
+def check_question(data):
+    """
+    Validate an /ask request body. Returns (question, thread_id, error), where
+    error is an (error dict, status code) pair or None.
+    """
     question = data.get('question')
     thread_id = data.get('thread_id')
 
     if not question or not thread_id:
-        return jsonify({"error": "Question and Thread ID are required."}), 400
-    if thread_id not in threads:
-        return jsonify({"error": "Thread not found."}), 404
+        return None, None, ({"error": "Question and Thread ID are required."}, 400)
+    if threads.get(thread_id) is None:
+        return None, None, ({"error": "Thread not found."}, 404)
+
+    return question, thread_id, None
+
+
+def get_question_and_thread():
+    """
+    Validate the /ask request body. Returns (question, thread_id, error_response).
+    """
+    question, thread_id, error = check_question(request.json)
+    if error:
+        body, status_code = error
+        return None, None, (jsonify(body), status_code)
+    return question, thread_id, None
+
+
+@app.route('/ask', methods=['POST'])
+def ask_question():
+    question, thread_id, error = get_question_and_thread()
+    if error:
+        return error
 
-    thread = threads[thread_id]['thread']
+    with count_round_trips() as round_trips:
+        response, status_code = run_assistant(question, thread_id)
+    # Report how many OpenAI API requests this question cost
+    response.headers['X-OpenAI-Round-Trips'] = str(round_trips.count)
+    return response, status_code
 
+
+def run_assistant(question, thread_id):
+    """
+    Ask the assistant a question in a thread and wait for its answer, running
+    any tool calls it makes along the way.
+    """
     try:
-        assistant = client.beta.assistants.retrieve(
-            "asst_Wk1Ue0iDYkhbdiXXDPPJsvAV")
+        with span('ask', 'get_assistant'):
+            assistant = get_assistant()
 
         # Create a message in the existing thread
-        message = client.beta.threads.messages.create(
-            thread_id=thread.id,
-            role="user",
-            content=question
-        )
+        with span('ask', 'create_message'):
+            message = client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=question
+            )
 
         # Run the assistant
-        run = client.beta.threads.runs.create(
-            thread_id=thread.id,
-            assistant_id=assistant.id
-        )
+        with span('ask', 'create_run'):
+            run = client.beta.threads.runs.create(
+                thread_id=thread_id,
+                assistant_id=assistant.id
+            )
 
         # Poll for the run to complete and handle tool calls
         while True:
-            run = client.beta.threads.runs.retrieve(
-                thread_id=thread.id,
-                run_id=run.id
-            )
+            with span('ask', 'wait_run'):
+                run = poll_run(client, thread_id, run.id,
+                               initial_delay=POLL_INITIAL_SECONDS, max_delay=POLL_MAX_SECONDS)
 
             if run.status == 'completed':
                 # Get the assistant's response
-                messages = client.beta.threads.messages.list(
-                    thread_id=thread.id)
+                with span('ask', 'list_messages'):
+                    messages = client.beta.threads.messages.list(
+                        thread_id=thread_id)
                 assistant_reply = messages.data[0].content[0].text.value
                 return jsonify({"response": assistant_reply}), 200
 
             elif run.status == 'requires_action':
                 # Handle tool calls
                 tool_calls = run.required_action.submit_tool_outputs.tool_calls
-                tool_outputs = []
-
-                for tool_call in tool_calls:
-                    if tool_call.function.name == "ir_stuff":
-                        # Parse arguments
-                        try:
-                            args = json.loads(tool_call.function.arguments)
-                        except json.JSONDecodeError as json_err:
-                            tool_outputs.append({
-                                "tool_call_id": tool_call.id,
-                                "output": json.dumps({"error": "Invalid JSON arguments"})
-                            })
-                            continue
-
-                        filename = args.get("filename")
-                        k = args.get("k", 5)
-
-                        # Ensure K is an integer
-                        try:
-                            k = int(k)
-                            if k <= 0:
-                                raise ValueError(
-                                    "K must be a positive integer.")
-                        except (ValueError, TypeError) as ve:
-                            tool_outputs.append({
-                                "tool_call_id": tool_call.id,
-                                "output": json.dumps({"error": "Invalid value for K. It must be a positive integer."})
-                            })
-                            continue
-
-                        # Call ir_stuff function
-                        response, status_code = ir_stuff(filename, k)
-                        if status_code == 200:
-                            tool_outputs.append({
-                                "tool_call_id": tool_call.id,
-                                "output": json.dumps(response.json)
-                            })
-                        else:
-                            tool_outputs.append({
-                                "tool_call_id": tool_call.id,
-                                "output": json.dumps({"error": "Failed to find similar documents"})
-                            })
+                with span('ask', 'tool_calls'):
+                    tool_outputs = handle_tool_calls(tool_calls)
 
                 # Submit tool outputs back to the assistant
-                run = client.beta.threads.runs.submit_tool_outputs(
-                    thread_id=thread.id,
-                    run_id=run.id,
-                    tool_outputs=tool_outputs
-                )
+                with span('ask', 'submit_tool_outputs'):
+                    run = client.beta.threads.runs.submit_tool_outputs(
+                        thread_id=thread_id,
+                        run_id=run.id,
+                        tool_outputs=tool_outputs
+                    )
                 continue
 
-            elif run.status == 'failed':
+            else:
+                # failed, cancelled, expired or incomplete
                 return jsonify({"error": "Assistant run failed"}), 500
 
-            time.sleep(1)  # Wait before polling again
-
+    except NotFoundError as e:
+        # The cached assistant may have been deleted or replaced
+        openai_resources.invalidate('assistant')
+        return jsonify({"error": str(e)}), 500
     except OpenAIError as e:
         return jsonify({"error": str(e)}), 500
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def sse(event, data):
+    """
+    Format one server-sent event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/askStream', methods=['POST'])
+def ask_question_stream():
+    """
+    Streaming variant of /ask. Relays the assistant run as server-sent events:
+    "token" for each text delta, "tool_call" when a tool runs, then "done"
+    with the full answer or "error".
+    """
+    question, thread_id, error = get_question_and_thread()
+    if error:
+        return error
+
+    @stream_with_context
+    def generate():
+        with count_round_trips() as round_trips:
+            yield from relay_run(round_trips)
+
+    def relay_run(round_trips):
+        try:
+            with span('ask_stream', 'get_assistant'):
+                assistant = get_assistant()
+
+            client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=question
+            )
+
+            stream = client.beta.threads.runs.create(
+                thread_id=thread_id,
+                assistant_id=assistant.id,
+                stream=True
+            )
+
+            answer = []
+            while stream is not None:
+                next_stream = None
+                with stream:
+                    for event in stream:
+                        if event.event == 'thread.message.delta':
+                            for content in event.data.delta.content or []:
+                                if content.type == 'text' and content.text.value:
+                                    answer.append(content.text.value)
+                                    yield sse('token', {"text": content.text.value})
+
+                        elif event.event == 'thread.run.requires_action':
+                            # Run the tools mid-stream and continue with a new stream
+                            run = event.data
+                            tool_calls = run.required_action.submit_tool_outputs.tool_calls
+                            for tool_call in tool_calls:
+                                yield sse('tool_call', {"name": tool_call.function.name})
+                            with span('ask_stream', 'tool_calls'):
+                                tool_outputs = handle_tool_calls(tool_calls)
+                            next_stream = client.beta.threads.runs.submit_tool_outputs(
+                                thread_id=thread_id,
+                                run_id=run.id,
+                                tool_outputs=tool_outputs,
+                                stream=True
+                            )
+                            break
+
+                        elif event.event in ('thread.run.failed', 'thread.run.cancelled',
+                                             'thread.run.expired'):
+                            yield sse('error', {"error": "Assistant run failed"})
+                            return
+
+                        elif event.event == 'error':
+                            yield sse('error', {"error": str(event.data)})
+                            return
+                stream = next_stream
+
+            yield sse('done', {"response": ''.join(answer), "openai_round_trips": round_trips.count})
+
+        except NotFoundError as e:
+            openai_resources.invalidate('assistant')
+            yield sse('error', {"error": str(e)})
+        except OpenAIError as e:
+            yield sse('error', {"error": str(e)})
+        except Exception as e:
+            yield sse('error', {"error": str(e)})
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 if __name__ == '__main__':
     # Added debug=True for more detailed logs
     app.run(host='0.0.0.0', port=5500, debug=True)
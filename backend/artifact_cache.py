@@ -0,0 +1,33 @@
+import os
+
+
+class TextArtifacts:
+    """
+    Extracted PDF text cached on disk by content hash, so identical uploads
+    never go through text extraction twice.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, content_hash):
+        return os.path.join(self.directory, f"{content_hash}.txt")
+
+    def load(self, content_hash):
+        """
+        Return the cached text for a content hash, or None.
+        """
+        try:
+            with open(self._path(content_hash), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def save(self, content_hash, text):
+        # Write then rename so readers never see a partial file
+        path = self._path(content_hash)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
@@ -0,0 +1,188 @@
+"""
+ASGI entry point with an asyncio /ask.
+
+POST /ask runs the assistant on AsyncOpenAI. A run waiting on the API
+(polling or between tool calls) holds no thread, so a single worker can keep
+hundreds of runs in flight. Every other route, including the Flask version of
+/ask for WSGI deployments, is served by the Flask app on a thread pool.
+
+    cd backend
+    uvicorn asgi:app --host 0.0.0.0 --port 5500
+"""
+import asyncio
+import json
+import os
+import time
+
+from a2wsgi import WSGIMiddleware
+from openai import NotFoundError, OpenAIError
+
+import api
+from metrics import REQUEST_SECONDS, span
+from openai_client import create_async_client, count_round_trips, poll_run_async
+
+
+# Threads serving the synchronous Flask routes
+WSGI_THREADS = int(os.environ.get('RFP_WSGI_THREADS', 16))
+
+# Runs waiting on the API hold a pooled connection only while a request is in flight
+async_client = create_async_client(
+    max_connections=int(os.environ.get('RFP_ASYNC_OPENAI_MAX_CONNECTIONS', 100)))
+
+flask_app = WSGIMiddleware(api.app, workers=WSGI_THREADS)
+
+
+async def get_assistant():
+    return await api.openai_resources.get_async(
+        'assistant', lambda: async_client.beta.assistants.retrieve(api.ASSISTANT_ID))
+
+
+async def handle_tool_calls(tool_calls):
+    """
+    Run the assistant's tool calls concurrently on the tool pool, with the same
+    deadlines and per-call error outputs as api.handle_tool_calls().
+    """
+    tasks = [api.tool_pool.submit(tool_call) for tool_call in tool_calls]
+    await asyncio.gather(*(task.wait_async() for task in tasks))
+
+    tool_outputs = []
+    for task in tasks:
+        tool_outputs.append({
+            "tool_call_id": task.tool_call.id,
+            "output": task.output()
+        })
+
+    return tool_outputs
+
+
+async def run_assistant(question, thread_id):
+    """
+    asyncio version of api.run_assistant(). Returns (body dict, status code).
+    """
+    try:
+        with span('ask', 'get_assistant'):
+            assistant = await get_assistant()
+
+        with span('ask', 'create_message'):
+            await async_client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=question
+            )
+
+        with span('ask', 'create_run'):
+            run = await async_client.beta.threads.runs.create(
+                thread_id=thread_id,
+                assistant_id=assistant.id
+            )
+
+        while True:
+            with span('ask', 'wait_run'):
+                run = await poll_run_async(async_client, thread_id, run.id,
+                                           initial_delay=api.POLL_INITIAL_SECONDS,
+                                           max_delay=api.POLL_MAX_SECONDS)
+
+            if run.status == 'completed':
+                with span('ask', 'list_messages'):
+                    messages = await async_client.beta.threads.messages.list(
+                        thread_id=thread_id)
+                return {"response": messages.data[0].content[0].text.value}, 200
+
+            elif run.status == 'requires_action':
+                tool_calls = run.required_action.submit_tool_outputs.tool_calls
+                with span('ask', 'tool_calls'):
+                    tool_outputs = await handle_tool_calls(tool_calls)
+                with span('ask', 'submit_tool_outputs'):
+                    run = await async_client.beta.threads.runs.submit_tool_outputs(
+                        thread_id=thread_id,
+                        run_id=run.id,
+                        tool_outputs=tool_outputs
+                    )
+                continue
+
+            else:
+                # failed, cancelled, expired or incomplete
+                return {"error": "Assistant run failed"}, 500
+
+    except NotFoundError as e:
+        # The cached assistant may have been deleted or replaced
+        api.openai_resources.invalidate('assistant')
+        return {"error": str(e)}, 500
+    except OpenAIError as e:
+        return {"error": str(e)}, 500
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body', False):
+            return body
+
+
+async def send_json(send, status_code, data, headers=()):
+    body = json.dumps(data).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    *headers]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def ask_question(scope, receive, send):
+    start = time.perf_counter()
+    status_code = await answer_question(receive, send)
+    REQUEST_SECONDS.observe(time.perf_counter() - start, '/ask', 'POST', status_code)
+
+
+async def answer_question(receive, send):
+    """
+    Handle one POST /ask and return the status code sent.
+    """
+    try:
+        data = json.loads(await read_body(receive))
+        if not isinstance(data, dict):
+            raise ValueError
+    except ValueError:
+        await send_json(send, 400, {"error": "Request body must be a JSON object."})
+        return 400
+
+    # Thread lookups go to SQLite; keep them off the event loop
+    loop = asyncio.get_running_loop()
+    question, thread_id, error = await loop.run_in_executor(None, api.check_question, data)
+    if error:
+        await send_json(send, error[1], error[0])
+        return error[1]
+
+    with count_round_trips() as round_trips:
+        body, status_code = await run_assistant(question, thread_id)
+    # Report how many OpenAI API requests this question cost
+    await send_json(send, status_code, body,
+                    headers=[(b"x-openai-round-trips", str(round_trips.count).encode())])
+    return status_code
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await async_client.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+    elif scope["type"] == "http" and scope["path"] == "/ask" and scope["method"] == "POST":
+        await ask_question(scope, receive, send)
+    else:
+        await flask_app(scope, receive, send)
@@ -0,0 +1,159 @@
+import argparse
+
+from openai_client import create_client
+
+
+ASSISTANT_ID = "asst_Wk1Ue0iDYkhbdiXXDPPJsvAV"
+
+# Filters shared by the search tools; see partitions.parse_filters
+FILTER_PROPERTIES = {
+    "category": {
+        "description": "Only return documents of this category (the file name prefix before the "
+                       "first underscore), or of any of these categories.",
+        "anyOf": [
+            {"type": "string"},
+            {"type": "array", "items": {"type": "string"}}
+        ]
+    },
+    "uploaded_after": {
+        "type": "string",
+        "description": "Only return documents uploaded at or after this ISO 8601 date or "
+                       "date-time (UTC), e.g. 2024-01-31."
+    },
+    "uploaded_before": {
+        "type": "string",
+        "description": "Only return documents uploaded at or before this ISO 8601 date or "
+                       "date-time (UTC)."
+    }
+}
+
+# Function tools the assistant is given; the handlers are api.TOOL_HANDLERS
+TOOL_DEFINITIONS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "ir_stuff",
+            "description": "Find the stored RFP documents most similar to a given document.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "Title of the query document: its file name without "
+                                       "the .pdf extension."
+                    },
+                    "k": {
+                        "type": "integer",
+                        "description": "Number of similar documents to return (default 5)."
+                    },
+                    **FILTER_PROPERTIES
+                },
+                "required": ["filename"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "ir_stuff_batch",
+            "description": "Find the stored RFP documents most similar to each of several documents "
+                           "in one call. Use it instead of repeated ir_stuff calls.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "filenames": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Titles of the query documents (file names without .pdf)."
+                    },
+                    "query_category": {
+                        "type": "string",
+                        "description": "Also use every document of this category as a query document."
+                    },
+                    "k": {
+                        "type": "integer",
+                        "description": "Number of similar documents per query document (default 5)."
+                    },
+                    **FILTER_PROPERTIES
+                }
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "keyword_search",
+            "description": "Search the stored RFP documents by keywords in their text. Best for "
+                           "exact terms such as clause numbers, product names or province names.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Words to search for."
+                    },
+                    "k": {
+                        "type": "integer",
+                        "description": "Number of documents to return (default 5)."
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["bm25", "hybrid"],
+                        "description": "'bm25' ranks by keyword matches only; 'hybrid' (default) "
+                                       "also weighs how close each document's meaning is to the query."
+                    },
+                    **FILTER_PROPERTIES
+                },
+                "required": ["query"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "semantic_search",
+            "description": "Find the stored RFP documents closest in meaning to a free-text "
+                           "description or question. Faster than searching the files.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "What to look for, in natural language."
+                    },
+                    "k": {
+                        "type": "integer",
+                        "description": "Number of documents to return (default 5)."
+                    },
+                    **FILTER_PROPERTIES
+                },
+                "required": ["query"]
+            }
+        }
+    }
+]
+
+
+def update_assistant_tools(client, assistant_id=ASSISTANT_ID):
+    """
+    Replace the assistant's definitions of the function tools defined here.
+
+    Other tools (such as file_search) and other functions are kept.
+
+    Returns:
+        Assistant: The updated assistant
+    """
+    names = {tool["function"]["name"] for tool in TOOL_DEFINITIONS}
+    assistant = client.beta.assistants.retrieve(assistant_id)
+    kept = [tool.model_dump(exclude_none=True) for tool in assistant.tools
+            if tool.type != "function" or tool.function.name not in names]
+    return client.beta.assistants.update(assistant_id, tools=kept + TOOL_DEFINITIONS)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Push the function tool definitions to the assistant.")
+    parser.add_argument('--assistant-id', default=ASSISTANT_ID)
+    args = parser.parse_args()
+
+    assistant = update_assistant_tools(create_client(), args.assistant_id)
+    print(f"{assistant.id}: {', '.join(tool.function.name if tool.type == 'function' else tool.type for tool in assistant.tools)}")
@@ -0,0 +1,262 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from partitions import RowPartitions
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within one process
+    fcntl = None
+
+
+class EmbeddingStore:
+    """
+    Append-only on-disk store for document embeddings.
+
+    Layout of the store directory:
+        embeddings.f32   contiguous float32 matrix, one row per document
+        metadata.jsonl   one JSON object per row with "doc_id" and "metadata"
+        store.json       manifest with the embedding dimension and dtype
+
+    The matrix is memory-mapped for reads and only ever appended to, so adding
+    a document costs O(1) regardless of corpus size. Title -> row and content
+    hash -> row indexes are kept in memory for O(1) lookups, and rows are
+    partitioned by category and upload time for filtered searches.
+    """
+
+    MATRIX_FILE = 'embeddings.f32'
+    METADATA_FILE = 'metadata.jsonl'
+    MANIFEST_FILE = 'store.json'
+    LOCK_FILE = 'store.lock'
+    DTYPE = np.float32
+
+    def __init__(self, directory):
+        """
+        Open (or create) the store in `directory`.
+
+        Args:
+            directory (str): Directory holding the store files
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.matrix_path = os.path.join(directory, self.MATRIX_FILE)
+        self.metadata_path = os.path.join(directory, self.METADATA_FILE)
+        self.manifest_path = os.path.join(directory, self.MANIFEST_FILE)
+        self.lock_path = os.path.join(directory, self.LOCK_FILE)
+
+        self.dim = None
+        self.records = []  # {"doc_id": ..., "metadata": {...}} per row
+        self.title_index = {}  # title -> row
+        self.title_rows = {}  # title -> every row with that title, e.g. re-uploads
+        self.hash_index = {}  # content sha256 -> row
+        self.partitions = RowPartitions()  # category / upload time -> rows
+        self._metadata_offset = 0  # Bytes of metadata.jsonl already parsed
+        self._matrix = None
+        self._lock = threading.RLock()
+        self.refresh()
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def row_bytes(self):
+        return self.dim * np.dtype(self.DTYPE).itemsize
+
+    def version(self):
+        """
+        Cheap change marker for the store: size and mtime of metadata.jsonl.
+
+        Returns None while the store is empty.
+        """
+        try:
+            stat = os.stat(self.metadata_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def refresh(self):
+        """
+        Pick up rows appended since the last read (e.g. by another process).
+
+        Only the new tail of metadata.jsonl is parsed.
+
+        Returns:
+            int: Number of rows added to the in-memory view
+        """
+        with self._lock:
+            if self.dim is None and os.path.exists(self.manifest_path):
+                with open(self.manifest_path, 'r') as f:
+                    self.dim = json.load(f)['dim']
+            if not os.path.exists(self.metadata_path):
+                return 0
+
+            added = 0
+            with open(self.metadata_path, 'rb') as f:
+                f.seek(self._metadata_offset)
+                for line in f:
+                    # Ignore a partially written last line
+                    if not line.endswith(b'\n'):
+                        break
+                    self._metadata_offset += len(line)
+                    record = json.loads(line)
+                    self._index_record(len(self.records), record)
+                    self.records.append(record)
+                    added += 1
+
+            # Vectors are written before metadata, so every parsed row has its vector
+            if added:
+                self._matrix = None
+            return added
+
+    def _index_record(self, row, record):
+        metadata = record.get('metadata', {})
+        title = metadata.get('title')
+        if title is not None:
+            # Keep the first document with a given title, like the old JSON scan did
+            self.title_index.setdefault(title, row)
+            self.title_rows.setdefault(title, []).append(row)
+        content_hash = metadata.get('sha256')
+        if content_hash is not None:
+            self.hash_index.setdefault(content_hash, row)
+        self.partitions.add(row, metadata)
+
+    def matrix(self):
+        """
+        Return a read-only memory-mapped (rows, dim) float32 view of all embeddings.
+        """
+        with self._lock:
+            if not self.records:
+                return np.empty((0, self.dim or 0), dtype=self.DTYPE)
+            if self._matrix is None or self._matrix.shape[0] != len(self.records):
+                self._matrix = np.memmap(
+                    self.matrix_path, dtype=self.DTYPE, mode='r',
+                    shape=(len(self.records), self.dim)
+                )
+            return self._matrix
+
+    def row_for_title(self, title):
+        """
+        Look up the row of the document with the given title, or None.
+        """
+        return self.title_index.get(title)
+
+    def row_for_hash(self, content_hash):
+        """
+        Look up the row of the document with the given content SHA-256, or None.
+        """
+        return self.hash_index.get(content_hash)
+
+    def append(self, doc_id, embedding, metadata):
+        """
+        Append one document to the store.
+
+        Returns:
+            int: Row number of the new document
+        """
+        return self.append_many([(doc_id, embedding, metadata)])[0]
+
+    def append_many(self, entries):
+        """
+        Append several documents with one write per file.
+
+        Args:
+            entries (list): (doc_id, embedding, metadata) tuples
+
+        Returns:
+            list: Row numbers of the new documents
+        """
+        if not entries:
+            return []
+
+        vectors = np.asarray([embedding for _, embedding, _ in entries], dtype=self.DTYPE)
+        if vectors.ndim != 2:
+            raise ValueError("Embeddings must all have the same dimension")
+
+        with self._lock, self._process_lock():
+            # Pick up rows (and the manifest) written by other processes first
+            self.refresh()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self.manifest_path, 'w') as f:
+                    json.dump({"dim": self.dim, "dtype": np.dtype(self.DTYPE).name}, f)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match store dimension {self.dim}")
+
+            first_row = len(self.records)
+
+            # Vectors first: a row is only visible once its metadata line is written,
+            # so a crash between the two writes leaves an orphan vector we truncate here
+            mode = 'r+b' if os.path.exists(self.matrix_path) else 'wb'
+            with open(self.matrix_path, mode) as f:
+                f.truncate(first_row * self.row_bytes)
+                f.seek(first_row * self.row_bytes)
+                f.write(vectors.tobytes())
+
+            lines = []
+            records = []
+            for doc_id, _, metadata in entries:
+                record = {"doc_id": doc_id, "metadata": metadata}
+                records.append(record)
+                lines.append(json.dumps(record) + '\n')
+            data = ''.join(lines).encode('utf-8')
+            # Drop a partial line left by a crashed write, as for orphan vectors above
+            mode = 'r+b' if os.path.exists(self.metadata_path) else 'wb'
+            with open(self.metadata_path, mode) as f:
+                f.truncate(self._metadata_offset)
+                f.seek(self._metadata_offset)
+                f.write(data)
+            self._metadata_offset += len(data)
+
+            for i, record in enumerate(records):
+                self._index_record(first_row + i, record)
+                self.records.append(record)
+            self._matrix = None
+
+            return list(range(first_row, first_row + len(entries)))
+
+    @contextmanager
+    def _process_lock(self):
+        # Serializes appends across worker processes sharing the directory
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def migrate_json(self, json_path):
+        """
+        One-time import of the legacy embeddings.json list into the store.
+
+        The JSON file is renamed to `<name>.migrated` afterwards so the import
+        does not run again.
+
+        Args:
+            json_path (str): Path of the legacy embeddings.json
+
+        Returns:
+            int: Number of documents imported
+        """
+        if not os.path.exists(json_path):
+            return 0
+
+        with open(json_path, 'r') as f:
+            legacy = json.load(f)
+
+        entries = [(doc['doc_id'], doc['embedding'], doc.get('metadata', {})) for doc in legacy]
+        with self._lock:
+            # Skip documents the store already has, in case an earlier run was interrupted
+            known = {record['doc_id'] for record in self.records}
+            entries = [entry for entry in entries if entry[0] not in known]
+            self.append_many(entries)
+
+        os.replace(json_path, json_path + '.migrated')
+        return len(entries)
@@ -0,0 +1,50 @@
+"""
+Gunicorn settings for serving the backend in production:
+
+    cd backend
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Graceful reload: `kill -HUP <master pid>` replaces the workers with fresh
+forks of the preloaded master; in-flight requests finish first. HUP does not
+re-import the code. To deploy new code, send USR2 to start a new master and
+then QUIT to the old one.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('RFP_BIND', '0.0.0.0:5500')
+
+# Worker processes and request threads per worker
+workers = int(os.environ.get('RFP_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('RFP_THREADS', 4))
+worker_class = 'gthread'
+
+# Load the app (model and indexes) once in the master, then fork
+preload_app = True
+
+# /ask holds a request open for the whole assistant run
+timeout = int(os.environ.get('RFP_WORKER_TIMEOUT', 300))
+graceful_timeout = int(os.environ.get('RFP_GRACEFUL_TIMEOUT', 60))
+keepalive = 5
+
+# Recycle workers after this many requests (0 disables) to bound memory growth
+max_requests = int(os.environ.get('RFP_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+# Native thread pools used by each worker after fork
+WORKER_NATIVE_THREADS = int(os.environ.get('RFP_WORKER_NATIVE_THREADS', 1))
+
+
+def post_fork(server, worker):
+    # Thread pools created in the master do not survive fork; size each worker's
+    # own pools so N workers do not oversubscribe the cores
+    try:
+        import torch
+        torch.set_num_threads(WORKER_NATIVE_THREADS)
+    except ImportError:
+        pass
+    try:
+        import faiss
+        faiss.omp_set_num_threads(WORKER_NATIVE_THREADS)
+    except ImportError:
+        pass
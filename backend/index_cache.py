@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from similarity import normalize_rows
+from quantization import INDEX_PRECISION, RERANK_FACTOR, QuantizedMatrix, check_precision, new_quantized_index
+
+
+# Consistent view of the index: the first `count` rows of matrix and records
+IndexSnapshot = namedtuple('IndexSnapshot', ['matrix', 'records', 'title_index', 'title_rows',
+                                             'partitions', 'count'])
+
+
+class IndexCache:
+    """
+    Keeps the normalized embedding matrix of an EmbeddingStore resident in memory.
+
+    Each `snapshot()` call checks the store's version (a stat of its metadata
+    file, no reads). When the store has grown, only the new rows are loaded and
+    normalized; otherwise the cached matrix is returned as is. Uploads in the
+    same process call `refresh()` directly so the next query sees them.
+
+    At float16 or int8 precision the resident rows are FAISS scalar-quantized
+    codes instead, and snapshots expose them as a QuantizedMatrix.
+    """
+
+    INITIAL_CAPACITY = 1024
+    QUANTIZE_CHUNK = 10000  # Rows normalized and encoded at a time
+
+    def __init__(self, store, precision=INDEX_PRECISION, rerank_factor=RERANK_FACTOR):
+        """
+        Args:
+            store (EmbeddingStore): Store to mirror
+            precision (str): 'float32', 'float16' or 'int8'
+            rerank_factor (int): Candidates re-ranked per result at lower precisions
+        """
+        self.store = store
+        self.precision = check_precision(precision)
+        self.rerank_factor = rerank_factor
+        self._buffer = None  # Normalized float32 rows; capacity grows by doubling
+        self._codes = None  # Quantized rows, for the other precisions
+        self._codes_lock = threading.Lock()  # Guards code adds against concurrent searches
+        self._count = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.rows_loaded = 0
+        self.last_reload_seconds = 0.0
+        self.total_reload_seconds = 0.0
+
+    def snapshot(self):
+        """
+        Return the current IndexSnapshot, loading new rows first if the store changed.
+        """
+        if self.store.version() == self._version:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.refresh()
+        return self._snapshot()
+
+    def _snapshot(self):
+        count = self._count
+        if self._codes is not None:
+            matrix = QuantizedMatrix(self._codes, self._codes_lock, self.store.matrix(), count,
+                                     self.rerank_factor)
+        elif self._buffer is not None:
+            matrix = self._buffer[:count]
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        return IndexSnapshot(matrix, self.store.records, self.store.title_index,
+                             self.store.title_rows, self.store.partitions, count)
+
+    def refresh(self):
+        """
+        Load rows appended to the store since the last refresh.
+
+        Returns:
+            int: Number of rows loaded
+        """
+        with self._lock:
+            start = time.perf_counter()
+            version = self.store.version()
+            self.store.refresh()
+
+            total = len(self.store)
+            new_rows = total - self._count
+            if new_rows > 0 and self.precision != 'float32':
+                self._add_codes(self.store.matrix(), total)
+            elif new_rows > 0:
+                normalized = normalize_rows(self.store.matrix()[self._count:total])
+                self._ensure_capacity(total, normalized.shape[1])
+                self._buffer[self._count:total] = normalized
+                # Publish the new count only after the rows are in place
+                self._count = total
+
+            self._version = version
+            elapsed = time.perf_counter() - start
+            self.reloads += 1
+            self.rows_loaded += max(new_rows, 0)
+            self.last_reload_seconds = elapsed
+            self.total_reload_seconds += elapsed
+            return max(new_rows, 0)
+
+    def _add_codes(self, matrix, total):
+        if self._codes is None:
+            self._codes = new_quantized_index(matrix.shape[1], self.precision)
+        for start in range(self._count, total, self.QUANTIZE_CHUNK):
+            stop = min(start + self.QUANTIZE_CHUNK, total)
+            normalized = normalize_rows(matrix[start:stop])
+            with self._codes_lock:
+                self._codes.add(normalized)
+            self._count = stop
+
+    def _ensure_capacity(self, rows, dim):
+        if self._buffer is not None and self._buffer.shape[0] >= rows:
+            return
+        # Spare rows cost no memory until written. Reserving them from the first
+        # load means appends after a fork only un-share the pages they write,
+        # instead of every worker copying the whole matrix into a new buffer
+        capacity = max(self.INITIAL_CAPACITY, 2 * rows)
+        if self._buffer is not None:
+            capacity = max(capacity, 2 * self._buffer.shape[0])
+        buffer = np.empty((capacity, dim), dtype=np.float32)
+        if self._buffer is not None:
+            # Old snapshots keep referencing the previous buffer, which stays valid
+            buffer[:self._count] = self._buffer[:self._count]
+        self._buffer = buffer
+
+    def stats(self):
+        """
+        Hit/miss counters and reload timings of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "rows": self._count,
+            "precision": self.precision,
+            "vector_bytes": self.vector_bytes(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "reloads": self.reloads,
+            "rows_loaded": self.rows_loaded,
+            "last_reload_ms": round(self.last_reload_seconds * 1000, 3),
+            "total_reload_ms": round(self.total_reload_seconds * 1000, 3)
+        }
+
+    def vector_bytes(self):
+        """
+        Bytes of the resident vectors; unused float32 capacity is not counted.
+        """
+        if self._codes is not None:
+            return self._codes.ntotal * self._codes.code_size
+        return self._count * self._buffer.shape[1] * self._buffer.itemsize if self._buffer is not None else 0
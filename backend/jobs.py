@@ -0,0 +1,291 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from metrics import STAGE_SECONDS
+from sqlite_connections import SQLiteConnections
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting to run."""
+
+
+class Job:
+    """
+    A unit of background work with per-stage progress and timings.
+    """
+
+    def __init__(self, kind, description=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.description = description
+        self.status = 'queued'
+        self.stages = OrderedDict()  # stage name -> {"status", "seconds"}
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self._start = None
+        self._end = None
+        self.on_change = None  # Called with the job after each state change
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a named stage of the job and record whether it succeeded.
+        """
+        info = {"status": "running", "seconds": None}
+        self.stages[name] = info
+        start = time.perf_counter()
+        try:
+            yield info
+        except BaseException:
+            info["status"] = "failed"
+            raise
+        else:
+            info["status"] = "completed"
+        finally:
+            seconds = time.perf_counter() - start
+            info["seconds"] = round(seconds, 4)
+            STAGE_SECONDS.observe(seconds, self.kind, name)
+            self.changed()
+
+    def changed(self):
+        if self.on_change is not None:
+            try:
+                self.on_change(self)
+            except Exception:
+                pass  # The in-process status is still available
+
+    def to_dict(self):
+        if self._start is None:
+            elapsed = None
+        else:
+            elapsed = round((self._end or time.perf_counter()) - self._start, 4)
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "description": self.description,
+            "status": self.status,
+            # Stages may be added from several threads; copy before iterating
+            "stages": [{"name": name, **info} for name, info in list(self.stages.items())],
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "seconds": elapsed
+        }
+
+
+def _process_alive(pid):
+    if pid is None:
+        return False
+    if os.name == 'nt':
+        return True  # No cheap check; such jobs are left to the client timeout
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore:
+    """
+    Job status snapshots in SQLite, so a job can be polled through any worker
+    process, not just the one running it.
+
+    Each row records the status and the process running the job, so jobs left
+    unfinished by a process that has exited can be marked as failed.
+    """
+
+    PRUNE_EVERY = 1000  # Saves between deletions of old finished jobs
+
+    def __init__(self, path, retention_seconds=7 * 24 * 3600):
+        """
+        Args:
+            path (str): SQLite database file
+            retention_seconds (float): Age after which finished jobs are deleted
+        """
+        self.retention_seconds = retention_seconds
+        self._saves = 0
+        self._connections = SQLiteConnections(path)
+        conn = self._connections.get()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " updated_at TEXT NOT NULL)"
+        )
+        # Columns added after the table was first created
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if 'status' not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN status TEXT")
+        if 'owner_pid' not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN owner_pid INTEGER")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at)")
+        conn.commit()
+
+    def save(self, job):
+        conn = self._connections.get()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, data, updated_at, status, owner_pid)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (job.id, json.dumps(job.to_dict()), datetime.utcnow().isoformat(), job.status, os.getpid())
+            )
+        self._saves += 1
+        if self._saves % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def fail_orphaned(self):
+        """
+        Mark queued or running jobs whose process has exited (e.g. before a
+        restart) as failed, so clients polling them stop waiting. Call at
+        startup, before this process submits jobs.
+
+        Returns:
+            int: Number of jobs marked as failed
+        """
+        conn = self._connections.get()
+        rows = conn.execute(
+            "SELECT id, data, owner_pid FROM jobs"
+            " WHERE status IS NULL OR status IN ('queued', 'running')"
+        ).fetchall()
+        now = datetime.utcnow().isoformat()
+        failed = 0
+        with conn:
+            for job_id, data, owner_pid in rows:
+                job = json.loads(data)
+                if job.get("status") not in ('queued', 'running'):
+                    continue
+                # This process has not run any job yet, even if it reuses a dead owner's pid
+                if owner_pid != os.getpid() and _process_alive(owner_pid):
+                    continue
+                job.update(status='failed', error="Interrupted by a backend restart", finished_at=now)
+                conn.execute("UPDATE jobs SET data = ?, status = 'failed', updated_at = ? WHERE id = ?",
+                             (json.dumps(job), now, job_id))
+                failed += 1
+        return failed
+
+    def prune(self):
+        """
+        Delete finished jobs last updated more than `retention_seconds` ago.
+
+        Returns:
+            int: Number of jobs deleted
+        """
+        cutoff = (datetime.utcnow() - timedelta(seconds=self.retention_seconds)).isoformat()
+        conn = self._connections.get()
+        with conn:
+            cursor = conn.execute(
+                # Rows saved before the status column existed have no status
+                "DELETE FROM jobs WHERE updated_at < ? AND (status IS NULL OR status IN ('completed', 'failed'))",
+                (cutoff,)
+            )
+        return cursor.rowcount
+
+    def load(self, job_id):
+        row = self._connections.get().execute(
+            "SELECT data FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool and keeps their status for polling.
+    """
+
+    def __init__(self, max_workers=2, max_pending=100, max_retained=1000, store=None):
+        """
+        Args:
+            max_workers (int): Jobs running at the same time
+            max_pending (int): Jobs allowed to wait for a worker before submit() refuses more
+            max_retained (int): Finished jobs kept for status queries
+            store (JobStore): Optional shared store that job states are written to
+        """
+        self.store = store
+        self.max_pending = max_pending
+        self.max_retained = max_retained
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingest')
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, description=None):
+        """
+        Queue `fn(job, *args)` to run in the background.
+
+        The return value of `fn` becomes the job result; an exception marks the
+        job as failed with its message as the error.
+
+        Returns:
+            Job: The queued job
+        """
+        job = Job(kind, description)
+        if self.store is not None:
+            job.on_change = self.store.save
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull("Too many jobs are waiting; try again later")
+            self._pending += 1
+            self._jobs[job.id] = job
+            self._evict()
+        job.changed()
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        with self._lock:
+            self._pending -= 1
+        job.status = 'running'
+        job.started_at = datetime.utcnow().isoformat()
+        job._start = time.perf_counter()
+        job.changed()
+        try:
+            job.result = fn(job, *args)
+            job.status = 'completed'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job._end = time.perf_counter()
+            job.finished_at = datetime.utcnow().isoformat()
+            job.changed()
+
+    def _evict(self):
+        # Drop the oldest finished jobs beyond the retention limit
+        excess = len(self._jobs) - self.max_retained
+        if excess <= 0:
+            return
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].status in ('completed', 'failed'):
+                del self._jobs[job_id]
+                excess -= 1
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """
+        Status dict of a job run by this process or, failing that, by any
+        process sharing the store. None if the job is unknown.
+        """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.store is not None:
+            return self.store.load(job_id)
+        return None
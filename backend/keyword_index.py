@@ -0,0 +1,402 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+from nltk.stem import PorterStemmer
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are only serialized within one process
+    fcntl = None
+
+
+# BM25 parameters and the segment merge policy
+BM25_K1 = float(os.environ.get('RFP_BM25_K1', 1.2))
+BM25_B = float(os.environ.get('RFP_BM25_B', 0.75))
+MERGE_FACTOR = int(os.environ.get('RFP_KEYWORD_MERGE_FACTOR', 4))  # Segments of one size tier merged together
+
+# Recorded in the manifest; an index built with another analyzer is rebuilt
+ANALYZER = 'porter/sklearn-english-stopwords/1'
+
+_WORD = re.compile(r'\w+')
+_stemmer = PorterStemmer()
+
+
+@lru_cache(maxsize=100000)
+def _stem(token):
+    return _stemmer.stem(token)
+
+
+def analyze(text):
+    """
+    Turn text into index terms: lowercase words without punctuation, English
+    stopwords removed, Porter-stemmed. These are the steps of
+    RFPPreprocessor.normalize_text and extract_keywords, with scikit-learn's
+    stopword list, which needs no NLTK data download.
+
+    Returns:
+        list: Stemmed terms in text order
+    """
+    return [_stem(word) for word in _WORD.findall(text.lower()) if word not in ENGLISH_STOP_WORDS]
+
+
+class Segment:
+    """
+    An immutable batch of indexed documents.
+
+    Postings are grouped by term (terms sorted) and by row within a term.
+    On disk, rows are delta-coded within each term and the arrays are
+    zlib-compressed; in memory they are flat int32/uint16 arrays.
+    """
+
+    def __init__(self, name, terms, offsets, rows, tfs, doc_rows, doc_lengths):
+        self.name = name
+        self.terms = terms  # Sorted list of str
+        self.offsets = offsets  # Postings of term i are [offsets[i], offsets[i + 1])
+        self.rows = rows
+        self.tfs = tfs
+        self.doc_rows = doc_rows  # Rows of the documents in this segment
+        self.doc_lengths = doc_lengths  # Terms per document, aligned with doc_rows
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+
+    @property
+    def doc_count(self):
+        return len(self.doc_rows)
+
+    @classmethod
+    def build(cls, name, documents):
+        """
+        Args:
+            name (str): Segment name
+            documents (list): (row, terms) pairs
+
+        Returns:
+            Segment: The segment holding the documents
+        """
+        vocabulary = {}
+        term_ids, rows, tfs = [], [], []
+        doc_rows, doc_lengths = [], []
+        for row, terms in documents:
+            doc_rows.append(row)
+            doc_lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                rows.append(row)
+                tfs.append(tf)
+
+        terms = sorted(vocabulary)
+        # Renumber terms in sorted order, then sort postings by (term, row)
+        rank = np.empty(len(terms), dtype=np.int64)
+        rank[[vocabulary[term] for term in terms]] = np.arange(len(terms))
+        term_ids = rank[np.asarray(term_ids, dtype=np.int64)]
+        rows = np.asarray(rows, dtype=np.int32)
+        order = np.lexsort((rows, term_ids))
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(term_ids, minlength=len(terms)))))
+        return cls(name, terms, offsets.astype(np.int64), rows[order],
+                   np.minimum(np.asarray(tfs), np.iinfo(np.uint16).max).astype(np.uint16)[order],
+                   np.asarray(doc_rows, dtype=np.int64), np.asarray(doc_lengths, dtype=np.uint32))
+
+    @classmethod
+    def merge(cls, name, segments):
+        """
+        Combine segments (which cover disjoint rows) into one.
+        """
+        terms = sorted(set().union(*(segment.terms for segment in segments)))
+        term_index = {term: i for i, term in enumerate(terms)}
+        term_ids, rows, tfs = [], [], []
+        for segment in segments:
+            global_ids = np.asarray([term_index[term] for term in segment.terms], dtype=np.int64)
+            term_ids.append(np.repeat(global_ids, np.diff(segment.offsets)))
+            rows.append(segment.rows)
+            tfs.append(segment.tfs)
+        term_ids = np.concatenate(term_ids)
+        rows = np.concatenate(rows)
+        order = np.lexsort((rows, term_ids))
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(term_ids, minlength=len(terms)))))
+        return cls(name, terms, offsets.astype(np.int64), rows[order], np.concatenate(tfs)[order],
+                   np.concatenate([segment.doc_rows for segment in segments]),
+                   np.concatenate([segment.doc_lengths for segment in segments]))
+
+    def save(self, path):
+        # Delta-code rows within each term so the compressed file stays small
+        gaps = np.diff(self.rows, prepend=0).astype(np.int64)
+        starts = self.offsets[:-1][np.diff(self.offsets) > 0]
+        gaps[starts] = self.rows[starts]
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(
+                f, terms=np.frombuffer('\n'.join(self.terms).encode('utf-8'), dtype=np.uint8),
+                offsets=self.offsets, gaps=gaps.astype(np.uint32), tfs=self.tfs,
+                doc_rows=self.doc_rows, doc_lengths=self.doc_lengths)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, name, path):
+        with np.load(path) as data:
+            terms_bytes = data['terms'].tobytes()
+            terms = terms_bytes.decode('utf-8').split('\n') if terms_bytes else []
+            offsets = data['offsets']
+            gaps = data['gaps'].astype(np.int64)
+            # Undo the delta coding: running sum restarted at each term
+            totals = np.cumsum(gaps)
+            counts = np.diff(offsets)
+            before = np.concatenate(([0], totals))[offsets[:-1]]
+            rows = (totals - np.repeat(before, counts)).astype(np.int32)
+            return cls(name, terms, offsets, rows, data['tfs'], data['doc_rows'], data['doc_lengths'])
+
+    def postings(self, term):
+        """
+        (rows, term frequencies) of a term, or None if no document has it.
+        """
+        i = self.term_ids.get(term)
+        if i is None:
+            return None
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.rows[start:stop], self.tfs[start:stop]
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.rows.nbytes + self.tfs.nbytes + self.doc_rows.nbytes + self.doc_lengths.nbytes
+
+
+# What queries read, replaced as a whole when segments change. norms[row] is
+# the BM25 length normalization k1 * (1 - b + b * length / average length)
+KeywordView = namedtuple('KeywordView', ['segments', 'norms', 'indexed', 'doc_count'])
+
+
+class KeywordIndex:
+    """
+    Persisted BM25 inverted index over the analyzed text of embedding store
+    rows, so a keyword score and an embedding score refer to the same row.
+
+    Layout of the index directory:
+        manifest.json        analyzer, next segment number and live segments
+        segment-<n>.npz      one Segment each
+
+    Every add writes a new segment. Once MERGE_FACTOR segments share a size
+    tier (powers of MERGE_FACTOR documents) they are merged, so the number
+    of segments stays logarithmic in the corpus size. Other processes pick
+    up changes through `refresh()`, which only stats the manifest.
+    """
+
+    MANIFEST_FILE = 'manifest.json'
+    LOCK_FILE = 'index.lock'
+
+    def __init__(self, directory, k1=BM25_K1, b=BM25_B, merge_factor=MERGE_FACTOR):
+        """
+        Args:
+            directory (str): Directory holding the index files
+            k1 (float): BM25 term frequency saturation
+            b (float): BM25 document length normalization
+            merge_factor (int): Segments per size tier before they are merged
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest_path = os.path.join(directory, self.MANIFEST_FILE)
+        self.lock_path = os.path.join(directory, self.LOCK_FILE)
+        self.k1 = k1
+        self.b = b
+        self.merge_factor = max(2, merge_factor)
+        self._segments = {}  # name -> Segment
+        self._view = self._build_view([])
+        self._version = None
+        self._lock = threading.RLock()
+        self.refresh()
+
+    def version(self):
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = None
+        if manifest is None or manifest.get("analyzer") != ANALYZER:
+            # New index, or terms from another analyzer: start over
+            return {"analyzer": ANALYZER, "next_segment": 0, "segments": []}
+        return manifest
+
+    def _write_manifest(self, manifest):
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _segment_path(self, name):
+        return os.path.join(self.directory, f"{name}.npz")
+
+    def refresh(self):
+        """
+        Load segments written since the last refresh (e.g. by another process).
+        """
+        with self._lock:
+            version = self.version()
+            if version == self._version:
+                return
+            for _ in range(3):
+                manifest = self._read_manifest()
+                try:
+                    segments = {name: self._segments.get(name) or Segment.load(name, self._segment_path(name))
+                                for name in manifest["segments"]}
+                    break
+                except FileNotFoundError:
+                    # Merged away after we read the manifest; read it again
+                    continue
+            else:
+                raise RuntimeError("Keyword index manifest keeps referencing missing segments")
+            self._install(segments)
+            self._version = version
+
+    def _install(self, segments):
+        self._segments = segments
+        self._view = self._build_view(list(segments.values()))
+
+    def _build_view(self, segments):
+        size = max((int(segment.doc_rows.max()) + 1 for segment in segments if segment.doc_count), default=0)
+        lengths = np.zeros(size, dtype=np.float32)
+        indexed = np.zeros(size, dtype=bool)
+        for segment in segments:
+            lengths[segment.doc_rows] = segment.doc_lengths
+            indexed[segment.doc_rows] = True
+        doc_count = int(indexed.sum())
+        average = float(lengths.sum() / doc_count) if doc_count else 1.0
+        norms = (self.k1 * (1 - self.b + self.b * lengths / max(average, 1e-9))).astype(np.float32)
+        return KeywordView(tuple(segments), norms, indexed, doc_count)
+
+    def snapshot(self):
+        """
+        Current KeywordView, after loading changes from other processes.
+        """
+        if self.version() != self._version:
+            self.refresh()
+        return self._view
+
+    def missing_rows(self, row_count):
+        """
+        Rows below `row_count` that are not indexed yet.
+        """
+        indexed = self.snapshot().indexed
+        missing = np.ones(row_count, dtype=bool)
+        covered = min(row_count, len(indexed))
+        missing[:covered] = ~indexed[:covered]
+        return np.flatnonzero(missing)
+
+    def add(self, documents):
+        """
+        Index documents as a new segment. Rows already in the index are skipped.
+
+        Args:
+            documents (list): (row, terms) pairs, terms as returned by analyze()
+
+        Returns:
+            int: Number of documents added
+        """
+        with self._lock, self._process_lock():
+            self.refresh()
+            indexed = self._view.indexed
+            documents = [(row, terms) for row, terms in documents
+                         if row >= len(indexed) or not indexed[row]]
+            if not documents:
+                return 0
+
+            manifest = self._read_manifest()
+            segments = dict(self._segments)
+            name = f"segment-{manifest['next_segment']:08d}"
+            manifest["next_segment"] += 1
+            segment = Segment.build(name, documents)
+            segment.save(self._segment_path(name))
+            segments[name] = segment
+
+            merged_away = self._merge_tiers(segments, manifest)
+            manifest["segments"] = list(segments)
+            self._write_manifest(manifest)
+            self._version = self.version()
+            self._install(segments)
+
+            for old in merged_away:
+                os.remove(self._segment_path(old))
+            return len(documents)
+
+    def _merge_tiers(self, segments, manifest):
+        # Merge whenever merge_factor segments fall in the same size tier
+        merged_away = []
+        while True:
+            tiers = {}
+            for segment in segments.values():
+                tier = int(math.log(max(segment.doc_count, 1), self.merge_factor))
+                tiers.setdefault(tier, []).append(segment)
+            full = [group for group in tiers.values() if len(group) >= self.merge_factor]
+            if not full:
+                return merged_away
+            group = full[0]
+            name = f"segment-{manifest['next_segment']:08d}"
+            manifest["next_segment"] += 1
+            merged = Segment.merge(name, group)
+            merged.save(self._segment_path(name))
+            for segment in group:
+                del segments[segment.name]
+                merged_away.append(segment.name)
+            segments[name] = merged
+
+    @contextmanager
+    def _process_lock(self):
+        # Serializes writers across worker processes sharing the directory
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def scores(self, text, view=None):
+        """
+        BM25 score of every row for a query.
+
+        Args:
+            text (str): Query text, analyzed like the documents
+            view (KeywordView): View to score; the current one by default
+
+        Returns:
+            np.ndarray: float32 scores by row (0 for rows without a query term)
+        """
+        view = view or self.snapshot()
+        scores = np.zeros(len(view.norms), dtype=np.float32)
+        for term in set(analyze(text)):
+            postings = [p for p in (segment.postings(term) for segment in view.segments) if p is not None]
+            df = sum(len(rows) for rows, _ in postings)
+            if not df:
+                continue
+            idf = math.log(1 + (view.doc_count - df + 0.5) / (df + 0.5))
+            for rows, tfs in postings:
+                tfs = tfs.astype(np.float32)
+                # Rows are unique within a term's postings, so += adds once per row
+                scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + view.norms[rows])
+        return scores
+
+    def stats(self):
+        view = self._view
+        return {
+            "documents": view.doc_count,
+            "segments": len(view.segments),
+            "segment_terms": sum(len(segment.terms) for segment in view.segments),
+            "postings": sum(len(segment.rows) for segment in view.segments),
+            "memory_bytes": sum(segment.nbytes for segment in view.segments),
+            "disk_bytes": sum(os.path.getsize(self._segment_path(segment.name))
+                              for segment in view.segments
+                              if os.path.exists(self._segment_path(segment.name)))
+        }
@@ -0,0 +1,192 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Upper bounds in seconds; wide enough for both cache lookups and assistant runs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram per label combination, in the Prometheus model.
+    An observation is one bisect and a few additions under a lock.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            name (str): Metric name
+            help (str): One-line description
+            labelnames (tuple): Names of the labels passed to observe()
+            buckets (tuple): Sorted bucket upper bounds; +Inf is implied
+        """
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labelvalues):
+        """
+        Observe the wall time of the block, whether or not it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def samples(self):
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labelvalues, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                yield (self.name + '_bucket', _format_labels(
+                    self.labelnames, labelvalues, [('le', _format_value(bound))]), cumulative)
+            yield self.name + '_sum', _format_labels(self.labelnames, labelvalues), values[-1]
+            yield self.name + '_count', _format_labels(self.labelnames, labelvalues), cumulative
+
+
+class Counter:
+    """
+    Monotonic counter per label combination.
+    """
+
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labelvalues, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+
+class Collected:
+    """
+    Gauge or counter read from a callback at scrape time, for values other
+    components already track (corpus size, cache statistics).
+
+    The callback returns a number, or a dict of label value tuples to numbers.
+    """
+
+    def __init__(self, name, help, callback, labelnames=(), type='gauge'):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        self.type = type
+
+    def samples(self):
+        value = self.callback()
+        if not isinstance(value, dict):
+            value = {(): value}
+        for labelvalues, number in sorted(value.items()):
+            if number is not None:
+                yield self.name, _format_labels(self.labelnames, labelvalues), number
+
+
+class Registry:
+    """
+    Metrics exposed together at /metrics.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def collect(self, name, help, callback, labelnames=(), type='gauge'):
+        return self.register(Collected(name, help, callback, labelnames, type))
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                continue  # A failing callback must not break the scrape
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Time spent in each stage of an upload, ingestion job, question or tool call
+STAGE_SECONDS = REGISTRY.histogram(
+    'rfp_stage_seconds', 'Duration of a stage of a request or background job',
+    ('operation', 'stage'))
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'rfp_http_request_seconds', 'HTTP request duration (streams: until the response starts)',
+    ('endpoint', 'method', 'status'))
+
+RUN_POLLS = REGISTRY.histogram(
+    'rfp_assistant_run_polls', 'Status polls per wait for an assistant run',
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89))
+
+
+def span(operation, stage):
+    """
+    Time a block as `stage` of `operation` in rfp_stage_seconds.
+    """
+    return STAGE_SECONDS.time(operation, stage)
@@ -0,0 +1,69 @@
+import threading
+import time
+
+from sentence_transformers import SentenceTransformer
+
+
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+_models = {}  # Loaded SentenceTransformer instances keyed by model name
+_load_times = {}  # Seconds spent loading each model
+_lock = threading.Lock()
+
+
+def get_model(name=DEFAULT_MODEL_NAME):
+    """
+    Return the shared SentenceTransformer for `name`, loading it on first use.
+
+    The model is loaded at most once per process, even when several request
+    threads ask for it at the same time.
+
+    Args:
+        name (str): Name of the sentence-transformers model
+
+    Returns:
+        SentenceTransformer: The shared model instance
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        # Another thread may have finished loading while we waited
+        model = _models.get(name)
+        if model is None:
+            start = time.perf_counter()
+            model = SentenceTransformer(name)
+            _load_times[name] = time.perf_counter() - start
+            _models[name] = model
+    return model
+
+
+def warm_up(names=(DEFAULT_MODEL_NAME,)):
+    """
+    Load the given models up front so the first request does not pay for it.
+
+    Args:
+        names (iterable): Model names to load
+    """
+    for name in names:
+        get_model(name)
+
+
+def is_ready(names=(DEFAULT_MODEL_NAME,)):
+    """
+    Check whether all the given models are already loaded.
+    """
+    return all(name in _models for name in names)
+
+
+def status():
+    """
+    Describe the loaded models and how long each one took to load.
+    """
+    return {
+        "models": {
+            name: {"load_seconds": round(_load_times.get(name, 0.0), 3)}
+            for name in _models
+        }
+    }
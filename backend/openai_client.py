@@ -0,0 +1,176 @@
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI, DefaultHttpxClient
+
+from metrics import RUN_POLLS
+
+
+# Requests made to the OpenAI API in the current context, if one is being counted
+_round_trips = contextvars.ContextVar('openai_round_trips', default=None)
+
+
+class RoundTripCounter:
+    def __init__(self):
+        self.count = 0
+
+
+def _count_request(request):
+    counter = _round_trips.get()
+    if counter is not None:
+        counter.count += 1
+
+
+async def _count_request_async(request):
+    _count_request(request)
+
+
+@contextmanager
+def count_round_trips():
+    """
+    Count the OpenAI HTTP requests made inside the block (retries included).
+
+    Yields:
+        RoundTripCounter: Its `count` grows as requests are sent
+    """
+    counter = RoundTripCounter()
+    token = _round_trips.set(counter)
+    try:
+        yield counter
+    finally:
+        _round_trips.reset(token)
+
+
+def create_client(max_connections=20, max_keepalive_connections=10):
+    """
+    OpenAI client on a pooled HTTP client that keeps connections alive between
+    requests and counts requests for count_round_trips().
+
+    Args:
+        max_connections (int): Connections open to the API at the same time
+        max_keepalive_connections (int): Idle connections kept for reuse
+    """
+    http_client = DefaultHttpxClient(
+        limits=httpx.Limits(max_connections=max_connections,
+                            max_keepalive_connections=max_keepalive_connections),
+        event_hooks={'request': [_count_request]}
+    )
+    return OpenAI(http_client=http_client)
+
+
+def create_async_client(max_connections=100, max_keepalive_connections=20):
+    """
+    asyncio counterpart of create_client(), for the async /ask path. Runs that
+    wait on the API hold no thread, so the pool is sized for many of them.
+
+    Args:
+        max_connections (int): Connections open to the API at the same time
+        max_keepalive_connections (int): Idle connections kept for reuse
+    """
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=max_connections,
+                            max_keepalive_connections=max_keepalive_connections),
+        event_hooks={'request': [_count_request_async]}
+    )
+    return AsyncOpenAI(http_client=http_client)
+
+
+class ResourceCache:
+    """
+    Caches API objects such as the assistant and vector store for `ttl` seconds,
+    so each question does not fetch them again.
+    """
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._entries = {}  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """
+        Return the cached value for `key`, calling `loader()` if it is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+            value = loader()
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            return value
+
+    async def get_async(self, key, loader):
+        """
+        get() for coroutine loaders. Concurrent misses may each call `loader()`;
+        the last result is kept.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        value = await loader()
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+        return value
+
+    def invalidate(self, key=None):
+        """
+        Forget one cached object, or all of them.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+PENDING_RUN_STATUSES = ('queued', 'in_progress', 'cancelling')
+
+
+def poll_run(client, thread_id, run_id, initial_delay=0.1, max_delay=2.0, factor=1.5):
+    """
+    Wait for a run to leave the queued/in_progress states.
+
+    Polls right away, then backs off from `initial_delay` up to `max_delay`
+    seconds, so short runs return quickly and long ones do not flood the API.
+
+    Returns:
+        Run: The run in its first non-pending status
+    """
+    delay = initial_delay
+    polls = 0
+    while True:
+        run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
+        polls += 1
+        if run.status not in PENDING_RUN_STATUSES:
+            RUN_POLLS.observe(polls)
+            return run
+        time.sleep(delay)
+        delay = min(delay * factor, max_delay)
+
+
+async def poll_run_async(client, thread_id, run_id, initial_delay=0.1, max_delay=2.0, factor=1.5):
+    """
+    poll_run() for an AsyncOpenAI client. Waiting between polls yields to the
+    event loop instead of holding a thread.
+
+    Returns:
+        Run: The run in its first non-pending status
+    """
+    delay = initial_delay
+    polls = 0
+    while True:
+        run = await client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
+        polls += 1
+        if run.status not in PENDING_RUN_STATUSES:
+            RUN_POLLS.observe(polls)
+            return run
+        await asyncio.sleep(delay)
+        delay = min(delay * factor, max_delay)
@@ -0,0 +1,163 @@
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+# Restriction of a search to part of the corpus; None fields do not filter.
+# categories is a sorted tuple, the times are POSIX timestamps (UTC)
+SearchFilters = namedtuple('SearchFilters', ['categories', 'uploaded_after', 'uploaded_before'])
+NO_FILTERS = SearchFilters(None, None, None)
+
+
+def parse_timestamp(value):
+    """
+    Convert an ISO 8601 date or date-time to a POSIX timestamp.
+
+    Naive values are taken as UTC, like the upload_time the backend records.
+    """
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def parse_filters(args):
+    """
+    Read search filters from request or tool-call arguments.
+
+    Args:
+        args (dict): May contain "category" (a string or list of strings) and
+            "uploaded_after" / "uploaded_before" (ISO 8601 dates or date-times)
+
+    Returns:
+        SearchFilters: NO_FILTERS when no filter is given
+
+    Raises:
+        ValueError: If a filter has the wrong type or an unparseable date
+    """
+    categories = args.get("category")
+    if categories is not None:
+        if isinstance(categories, str):
+            categories = [categories]
+        if not isinstance(categories, list) or not all(isinstance(c, str) for c in categories):
+            raise ValueError("category must be a string or a list of strings.")
+        categories = tuple(sorted(set(categories)))
+
+    times = []
+    for name in ("uploaded_after", "uploaded_before"):
+        value = args.get(name)
+        if value is None:
+            times.append(None)
+            continue
+        try:
+            times.append(parse_timestamp(value))
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be an ISO 8601 date or date-time.")
+
+    return SearchFilters(categories, *times)
+
+
+class RowPartitions:
+    """
+    Row lists per category and an upload-time column for an append-only store,
+    so filtered searches only gather and score the vectors that match.
+
+    Rows are added in row order, so every partition is sorted. Each partition
+    is a (buffer, count) pair replaced as a whole, which lets readers use it
+    without locking while a writer appends.
+    """
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self):
+        self._categories = {}  # category -> (int64 rows buffer, count)
+        self._times = (np.empty(0, dtype=np.float64), 0)  # upload time by row, NaN if unknown
+        self._times_sorted = True  # Upload times ascend with the row number
+        self._lock = threading.Lock()
+
+    def add(self, row, metadata):
+        """
+        Record the category and upload time of a new row.
+
+        Args:
+            row (int): Row number; must be the next row of the store
+            metadata (dict): The row's stored metadata
+        """
+        try:
+            upload_time = parse_timestamp(metadata["upload_time"])
+        except (KeyError, TypeError, ValueError):
+            upload_time = np.nan
+
+        with self._lock:
+            category = metadata.get("category")
+            if category is not None:
+                self._categories[category] = self._append(self._categories.get(category), row, np.int64)
+
+            times, count = self._times
+            if count and not upload_time >= times[count - 1]:
+                self._times_sorted = False
+            self._times = self._append(self._times, upload_time, np.float64)
+
+    def _append(self, partition, value, dtype):
+        buffer, count = partition if partition is not None else (np.empty(0, dtype=dtype), 0)
+        if count == len(buffer):
+            # Readers keep the old buffer, whose first `count` entries stay valid
+            grown = np.empty(max(self.INITIAL_CAPACITY, 2 * count), dtype=dtype)
+            grown[:count] = buffer[:count]
+            buffer = grown
+        buffer[count] = value
+        return buffer, count + 1
+
+    def counts(self):
+        """
+        Number of rows in each category.
+        """
+        return {category: count for category, (_, count) in list(self._categories.items())}
+
+    def select(self, filters, count):
+        """
+        Rows among the first `count` that match the filters.
+
+        Args:
+            filters (SearchFilters): Filters to apply
+            count (int): Rows visible to the caller (e.g. a snapshot's row count)
+
+        Returns:
+            np.ndarray | None: Sorted int64 row numbers, or None when nothing is filtered
+        """
+        if filters == NO_FILTERS:
+            return None
+        times, time_count = self._times
+        times = times[:min(time_count, count)]
+
+        if filters.categories is not None:
+            parts = []
+            for category in filters.categories:
+                buffer, rows = self._categories.get(category, (None, 0))
+                if rows:
+                    buffer = buffer[:rows]
+                    parts.append(buffer[:np.searchsorted(buffer, count)])
+            if not parts:
+                return np.empty(0, dtype=np.int64)
+            rows = parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+            if filters.uploaded_after is None and filters.uploaded_before is None:
+                return rows
+            return rows[self._time_mask(times[rows], filters)]
+
+        if self._times_sorted:
+            # Time-ordered rows: the range is one contiguous block
+            start = 0 if filters.uploaded_after is None else np.searchsorted(times, filters.uploaded_after, 'left')
+            stop = len(times) if filters.uploaded_before is None else np.searchsorted(times, filters.uploaded_before, 'right')
+            return np.arange(start, max(start, stop), dtype=np.int64)
+        return np.flatnonzero(self._time_mask(times, filters)).astype(np.int64)
+
+    @staticmethod
+    def _time_mask(times, filters):
+        mask = ~np.isnan(times)
+        if filters.uploaded_after is not None:
+            mask &= times >= filters.uploaded_after
+        if filters.uploaded_before is not None:
+            mask &= times <= filters.uploaded_before
+        return mask
@@ -0,0 +1,149 @@
+import io
+import math
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pdfplumber
+
+from metrics import REGISTRY
+
+
+# Worker processes for page extraction; PDFs shorter than PARALLEL_MIN_PAGES are extracted inline
+PDF_WORKERS = int(os.environ.get('RFP_PDF_WORKERS', os.cpu_count() or 1))
+PARALLEL_MIN_PAGES = int(os.environ.get('RFP_PDF_PARALLEL_MIN_PAGES', 16))
+TASKS_PER_WORKER = 4  # Smaller page ranges even out slow pages across workers
+
+PAGE_SECONDS = REGISTRY.histogram(
+    'rfp_pdf_page_seconds', 'Text extraction time of one PDF page',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+
+
+def open_pdf(source):
+    """
+    Open a PDF given as a path or as its bytes.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return pdfplumber.open(source)
+
+
+def extract_page_range(source, start, stop):
+    """
+    Extract pages [start, stop) of a PDF, each exactly once.
+
+    Runs in the pool workers, so it must stay importable without the backend.
+
+    Args:
+        source (str | bytes): PDF path or contents
+
+    Returns:
+        list: (text, seconds) per page, in page order
+    """
+    pages = []
+    with open_pdf(source) as pdf:
+        for page in pdf.pages[start:stop]:
+            page_start = time.perf_counter()
+            text = page.extract_text()
+            pages.append((text, time.perf_counter() - page_start))
+            page.close()  # Free the parsed page objects as we go
+    return pages
+
+
+def _pool_context():
+    # Fork where available. Spawned workers would re-import __main__, which for
+    # `python api.py` means loading the whole backend again in every worker;
+    # forked workers only ever run extract_page_range.
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+class PageExtractor:
+    """
+    Extracts PDF text page by page, spreading the pages of large documents
+    across a process pool (pdfplumber is pure Python and holds the GIL).
+
+    The pool is created on first use in each process, so a server that
+    preloads the app forks its workers before any pool exists.
+    """
+
+    def __init__(self, workers=PDF_WORKERS, parallel_min_pages=PARALLEL_MIN_PAGES, spill_directory=None):
+        """
+        Args:
+            workers (int): Extraction processes; 1 extracts in the calling thread
+            parallel_min_pages (int): Page count from which the pool is used
+            spill_directory (str): Where PDFs given as bytes are written for the
+                pool; None uses the system temporary directory
+        """
+        self.workers = max(1, workers)
+        self.parallel_min_pages = parallel_min_pages
+        self.spill_directory = spill_directory
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _reset_pool(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def extract(self, source):
+        """
+        Extract the text of a PDF.
+
+        Args:
+            source (str | bytes): PDF path or contents. Contents that are split
+                across the pool are written to a temporary file first, so each
+                task is sent a path rather than a copy of the document.
+
+        Returns:
+            tuple: (text, page_seconds) where text joins the non-empty pages
+            with newlines and page_seconds lists the time spent on each page
+        """
+        with open_pdf(source) as pdf:
+            page_count = len(pdf.pages)
+
+        if self.workers == 1 or page_count < self.parallel_min_pages:
+            pages = extract_page_range(source, 0, page_count)
+        elif isinstance(source, (bytes, bytearray)):
+            fd, path = tempfile.mkstemp(suffix='.pdf', dir=self.spill_directory)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(source)
+                pages = self._extract_parallel(path, page_count)
+            finally:
+                os.remove(path)
+        else:
+            pages = self._extract_parallel(source, page_count)
+
+        for _, seconds in pages:
+            PAGE_SECONDS.observe(seconds)
+        text = '\n'.join(page_text for page_text, _ in pages if page_text)
+        return text, [seconds for _, seconds in pages]
+
+    def _extract_parallel(self, path, page_count):
+        per_task = math.ceil(page_count / (self.workers * TASKS_PER_WORKER))
+        starts = range(0, page_count, per_task)
+        pool = self._get_pool()
+        try:
+            # map() yields in submission order, so pages stay in document order
+            ranges = pool.map(extract_page_range, [path] * len(starts), starts,
+                              [start + per_task for start in starts])
+            return [page for page_range in ranges for page in page_range]
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool next time
+            self._reset_pool(pool)
+            raise
@@ -0,0 +1,193 @@
+import os
+
+import numpy as np
+
+from similarity import normalize_rows
+
+try:
+    import faiss
+except ImportError:  # float32 only
+    faiss = None
+
+
+PRECISIONS = ('float32', 'float16', 'int8')
+
+# Precision of the resident search vectors; the store always keeps float32
+INDEX_PRECISION = os.environ.get('RFP_INDEX_PRECISION', 'float32')
+# Quantized scans return k * RERANK_FACTOR candidates, re-ranked at full precision
+RERANK_FACTOR = int(os.environ.get('RFP_RERANK_FACTOR', 4))
+
+# int8 codes cover [-INT8_RANGE, INT8_RANGE] in 255 steps; components of 384-d
+# unit vectors sit far inside it, larger ones are clipped
+INT8_RANGE = 0.5
+
+
+def check_precision(precision):
+    """
+    Validate an index precision setting.
+
+    Returns:
+        str: The precision
+
+    Raises:
+        ValueError: If it is not one of PRECISIONS, or needs FAISS and FAISS is missing
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown index precision {precision!r}; use one of {', '.join(PRECISIONS)}.")
+    if precision != 'float32' and faiss is None:
+        raise ValueError(f"Index precision {precision} needs the faiss package.")
+    return precision
+
+
+def quantizer_type(precision):
+    """
+    FAISS scalar quantizer type of a precision other than float32.
+    """
+    return {
+        'float16': faiss.ScalarQuantizer.QT_fp16,
+        'int8': faiss.ScalarQuantizer.QT_8bit_uniform
+    }[precision]
+
+
+def precision_of(quantizer):
+    """
+    Precision of a FAISS ScalarQuantizer, or None if it is not one used here.
+    """
+    return {
+        faiss.ScalarQuantizer.QT_fp16: 'float16',
+        faiss.ScalarQuantizer.QT_8bit_uniform: 'int8'
+    }.get(quantizer.qtype)
+
+
+def train_fixed_range(index, dim):
+    """
+    Train an int8 quantizer on the fixed [-INT8_RANGE, INT8_RANGE] range.
+
+    A fixed range needs no sample of the corpus, so codes never have to be
+    rebuilt as documents arrive. float16 quantizers need no training.
+    """
+    if not index.is_trained:
+        bounds = np.full((2, dim), INT8_RANGE, dtype=np.float32)
+        bounds[0] *= -1
+        index.train(bounds)
+
+
+def new_quantized_index(dim, precision):
+    """
+    Empty flat FAISS index holding vectors as `precision` codes, scored by inner product.
+    """
+    index = faiss.IndexScalarQuantizer(dim, quantizer_type(precision), faiss.METRIC_INNER_PRODUCT)
+    train_fixed_range(index, dim)
+    return index
+
+
+class QuantizedMatrix:
+    """
+    The first `count` rows of the normalized embeddings, scanned as quantized codes.
+
+    Stands in for the float32 matrix of an IndexSnapshot. Indexing returns
+    exact normalized rows read from the store, so gathers, query vectors and
+    re-ranking stay at full precision; only full scans (top_k, batch_top_k)
+    run over the compact codes, and their best candidates are re-scored exactly.
+    """
+
+    approximate = True
+    dtype = np.dtype(np.float32)
+
+    def __init__(self, codes, lock, full, count, rerank_factor=RERANK_FACTOR):
+        """
+        Args:
+            codes (faiss.IndexScalarQuantizer): Codes of at least `count` rows
+            lock (threading.Lock): Guards `codes` against concurrent adds
+            full (np.ndarray): Store matrix (rows, dim), not normalized
+            count (int): Rows visible through this matrix
+            rerank_factor (int): Candidates scanned per result
+        """
+        self.codes = codes
+        self.full = full[:count]
+        self.count = count
+        self.rerank_factor = max(1, rerank_factor)
+        self._lock = lock
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def shape(self):
+        return self.full.shape
+
+    def __getitem__(self, key):
+        return normalize_rows(self.full[key])
+
+    def search(self, queries, k, rows=None):
+        """
+        Approximate top-K by the quantized scores.
+
+        Args:
+            queries (np.ndarray): (n, dim) normalized query vectors
+            k (int): Candidates per query
+            rows (np.ndarray): Rows to search among; None searches every row
+
+        Returns:
+            tuple: (scores, labels) arrays of shape (n, k); missing labels are -1
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        params = None
+        if rows is not None or self.codes.ntotal > self.count:
+            # Rows added after this snapshot are not part of it
+            params = faiss.SearchParameters()
+            params.sel = (faiss.IDSelectorRange(0, self.count) if rows is None
+                          else faiss.IDSelectorBatch(np.asarray(rows, dtype=np.int64)))
+        with self._lock:
+            return self.codes.search(queries, k, params=params)
+
+    def top_k(self, query, k, exclude_rows=()):
+        """
+        Top-K rows for a normalized query: quantized scan, then exact re-rank.
+
+        Returns:
+            tuple: (rows, scores) sorted by descending cosine similarity
+        """
+        exclude_rows = list(exclude_rows)
+        _, labels = self.search(query.reshape(1, -1), k * self.rerank_factor + len(exclude_rows))
+        candidates = labels[0][labels[0] >= 0]
+        if exclude_rows:
+            candidates = candidates[~np.isin(candidates, exclude_rows)]
+        return self._rerank(query.reshape(1, -1), candidates.reshape(1, -1), k)[0]
+
+    def batch_top_k(self, query_rows, k):
+        """
+        Top-K neighbours of several rows, each leaving out its own row.
+
+        Returns:
+            list: (rows, scores) per query, sorted by descending cosine similarity
+        """
+        query_rows = np.asarray(query_rows, dtype=np.int64)
+        queries = self[query_rows]
+        _, labels = self.search(queries, (k + 1) * self.rerank_factor)
+        labels[labels == query_rows[:, None]] = -1
+        return self._rerank(queries, labels, k)
+
+    def _rerank(self, queries, candidates, k):
+        """
+        Exact scores of each query's candidate rows (-1 for none), best K kept.
+        """
+        valid = candidates >= 0
+        gathered = self[np.where(valid, candidates, 0).ravel()].reshape(*candidates.shape, -1)
+        scores = np.einsum('qcd,qd->qc', gathered, queries)
+        scores[~valid] = -np.inf
+
+        order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+        results = []
+        for query_candidates, query_scores, query_order in zip(candidates, scores, order):
+            best_scores = query_scores[query_order]
+            keep = np.isfinite(best_scores)
+            results.append((query_candidates[query_order][keep].astype(np.int64), best_scores[keep]))
+        return results
+
+    @property
+    def nbytes(self):
+        """
+        Bytes of codes behind the visible rows.
+        """
+        return self.count * self.codes.code_size
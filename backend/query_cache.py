@@ -0,0 +1,75 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from similarity import normalize_rows
+
+
+_WORD = re.compile(r'\w+')
+
+
+def query_key(text):
+    """
+    Cache key of a query: its lowercase words, so questions differing only in
+    case, punctuation or spacing share one embedding.
+    """
+    return ' '.join(_WORD.findall(text.lower()))
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of normalized query embeddings, keyed by query_key().
+
+    Encoding a query with the embedding model is the slowest step of a local
+    search; repeated questions are served from here instead. The key itself
+    is what gets encoded, so every spelling of a query maps to the same vector.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> read-only unit-length vector
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text, encode):
+        """
+        Return the normalized embedding of a query, encoding it on a miss.
+
+        Args:
+            text (str): Query text
+            encode (callable): Maps text to an embedding, e.g. model.encode
+
+        Returns:
+            np.ndarray: float32 (dim,) unit-length vector; must not be modified
+        """
+        key = query_key(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            self.misses += 1
+
+        # Encode outside the lock so other queries are not held up
+        vector = normalize_rows(np.asarray(encode(key)).reshape(1, -1))[0]
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return vector
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of top-K search results.
+
+    Entries are keyed on the query (e.g. title and filters) and remember the
+    largest K computed, so a request for a smaller K is served from the prefix
+    of a cached larger-K result. Every entry belongs to one corpus version;
+    the whole cache is dropped as soon as a lookup sees a newer version.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (k, results)
+        self._version = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key, k, version):
+        """
+        Return the top-`k` results for `key` at corpus `version`, or None.
+        """
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < k:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1][:k]
+
+    def put(self, key, k, version, results):
+        """
+        Store the top-`k` results for `key` computed at corpus `version`.
+        """
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= k:
+                return
+            self._entries[key] = (k, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations
+        }
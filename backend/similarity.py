@@ -0,0 +1,198 @@
+import numpy as np
+
+
+def normalize_rows(matrix):
+    """
+    L2-normalize each row so dot products become cosine similarities.
+
+    Args:
+        matrix (np.ndarray): (rows, dim) embeddings
+
+    Returns:
+        np.ndarray: float32 (rows, dim) array with unit-length rows (zero rows stay zero)
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(normalized_matrix, query_vector, k, exclude_rows=(), rows=None):
+    """
+    Find the K rows most similar to a query with one matrix-vector product.
+
+    Uses np.argpartition so only the K best candidates are sorted. A
+    quantization.QuantizedMatrix scans its codes instead and re-ranks the
+    best candidates exactly.
+
+    Args:
+        normalized_matrix (np.ndarray): (rows, dim) unit-length embeddings
+        query_vector (np.ndarray): (dim,) query embedding, normalized or not
+        k (int): Number of results to return
+        exclude_rows (iterable): Rows that must not appear in the results
+        rows (np.ndarray): Only these rows are gathered and scored; None scores all
+
+    Returns:
+        tuple: (rows, scores) arrays sorted by descending cosine similarity
+    """
+    query = normalize_rows(np.asarray(query_vector).reshape(1, -1))[0]
+    if rows is None and getattr(normalized_matrix, 'approximate', False):
+        return normalized_matrix.top_k(query, k, exclude_rows)
+    if rows is None:
+        scores = normalized_matrix @ query
+    else:
+        rows = np.asarray(rows, dtype=np.int64)
+        scores = normalized_matrix[rows] @ query if len(rows) else np.empty(0, dtype=np.float32)
+
+    exclude_rows = list(exclude_rows)
+    if exclude_rows:
+        if rows is None:
+            scores[exclude_rows] = -np.inf
+        else:
+            excluded = np.isin(rows, exclude_rows)
+            scores[excluded] = -np.inf
+            exclude_rows = np.flatnonzero(excluded)
+
+    k = min(k, len(scores) - len(exclude_rows))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    order = np.argsort(-scores[candidates], kind='stable')
+    best = candidates[order][:k]
+    return (best if rows is None else rows[best]), scores[best]
+
+
+def batch_top_k(normalized_matrix, query_rows, k, rows=None, block_elements=1 << 24):
+    """
+    Find the K nearest neighbours of several stored rows at once.
+
+    Scores a block of queries with one matrix-matrix product and selects each
+    query's top K with np.argpartition along the rows. Blocks are sized so a
+    score matrix holds at most `block_elements` values. Every query is left
+    out of its own results. Unfiltered searches over a QuantizedMatrix scan
+    its codes and re-rank exactly, like top_k.
+
+    Args:
+        normalized_matrix (np.ndarray): (rows, dim) unit-length embeddings
+        query_rows (list): Rows of normalized_matrix to find neighbours for
+        k (int): Number of results per query
+        rows (np.ndarray): Sorted rows to search among; None searches every row
+        block_elements (int): Largest score matrix computed at once
+
+    Returns:
+        list: (rows, scores) per query, sorted by descending cosine similarity
+    """
+    query_rows = np.asarray(query_rows, dtype=np.int64)
+    if rows is None and getattr(normalized_matrix, 'approximate', False) and k > 0:
+        return normalized_matrix.batch_top_k(query_rows, k)
+    targets = normalized_matrix if rows is None else normalized_matrix[rows]
+    target_rows = np.arange(len(normalized_matrix)) if rows is None else np.asarray(rows, dtype=np.int64)
+    n = len(target_rows)
+    # One extra candidate per query makes up for its own row
+    selected = min(k + 1, n)
+    if k <= 0 or n == 0:
+        return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in query_rows]
+
+    results = []
+    block = max(1, block_elements // n)
+    for start in range(0, len(query_rows), block):
+        block_rows = query_rows[start:start + block]
+        scores = normalized_matrix[block_rows] @ targets.T
+
+        # A query's own row, wherever it is among the targets, scores -inf
+        positions = np.searchsorted(target_rows, block_rows)
+        own = positions < n
+        own[own] = target_rows[positions[own]] == block_rows[own]
+        scores[np.flatnonzero(own), positions[own]] = -np.inf
+
+        if selected < n:
+            candidates = np.argpartition(-scores, selected - 1, axis=1)[:, :selected]
+        else:
+            candidates = np.broadcast_to(np.arange(n), (len(block_rows), n))
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+        best = np.take_along_axis(candidates, order, axis=1)
+        best_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        for query_best, query_scores in zip(best, best_scores):
+            keep = np.isfinite(query_scores)
+            results.append((target_rows[query_best[keep]][:k], query_scores[keep][:k]))
+    return results
+
+
+def top_scores(scores, k, rows=None):
+    """
+    The K rows with the highest positive scores.
+
+    Args:
+        scores (np.ndarray): Score of every row
+        k (int): Number of results to return
+        rows (np.ndarray): Only consider these rows; None considers all
+
+    Returns:
+        tuple: (rows, scores) arrays sorted by descending score
+    """
+    if rows is None:
+        rows = np.flatnonzero(scores > 0)
+    else:
+        rows = rows[scores[rows] > 0]
+    candidate_scores = scores[rows]
+    if k < len(rows):
+        best = np.argpartition(-candidate_scores, k - 1)[:k]
+    else:
+        best = np.arange(len(rows))
+    best = best[np.argsort(-candidate_scores[best], kind='stable')]
+    return rows[best], candidate_scores[best]
+
+
+def fuse_scores(lexical, semantic, alpha):
+    """
+    Combine keyword and embedding scores of the same candidates.
+
+    Each score list is min-max scaled to [0, 1] over the candidates first, as
+    BM25 scores are unbounded and cosine similarities are not.
+
+    Args:
+        lexical (np.ndarray): BM25 score per candidate
+        semantic (np.ndarray): Cosine similarity per candidate
+        alpha (float): Weight of the embedding score, between 0 and 1
+
+    Returns:
+        np.ndarray: alpha * semantic + (1 - alpha) * lexical, both scaled
+    """
+    def scaled(scores):
+        scores = np.asarray(scores, dtype=np.float32)
+        spread = scores.max() - scores.min() if len(scores) else 0
+        return (scores - scores.min()) / spread if spread > 0 else np.zeros_like(scores)
+
+    return alpha * scaled(semantic) + (1 - alpha) * scaled(lexical)
+
+
+def describe_rows(records, rows, scores, score_key='similarity'):
+    """
+    Build the result entries ir_stuff returns for the given store rows.
+
+    Args:
+        records (list): Store records ({"doc_id": ..., "metadata": {...}}) by row
+        rows (np.ndarray): Result rows
+        scores (np.ndarray): Score of each row (cosine similarity for ir_stuff)
+        score_key (str): Name of the score field
+
+    Returns:
+        list: Dicts with doc_id, the score, category, file_path and title
+    """
+    results = []
+    for row, score in zip(rows, scores):
+        doc = records[row]
+        doc_metadata = doc.get('metadata', {})
+        results.append({
+            'doc_id': doc['doc_id'],
+            score_key: float(score),
+            'category': doc_metadata.get('category', 'Unknown'),
+            'file_path': doc_metadata.get('file_path', 'N/A'),
+            'title': doc_metadata.get('title', 'Untitled')
+        })
+    return results
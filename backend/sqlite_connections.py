@@ -0,0 +1,33 @@
+import os
+import sqlite3
+import threading
+
+
+class SQLiteConnections:
+    """
+    Hands out one SQLite connection per thread and per process.
+
+    Connections are never shared across fork(): a worker forked from a
+    preloading master opens its own connection on first use.
+    """
+
+    def __init__(self, path, timeout=10):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        conn = sqlite3.connect(path, timeout=timeout)
+        try:
+            # WAL lets readers in other processes run while one process writes
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
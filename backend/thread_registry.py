@@ -0,0 +1,93 @@
+import threading
+import time
+from datetime import datetime
+
+from sqlite_connections import SQLiteConnections
+
+
+class ThreadRegistry:
+    """
+    Conversation threads (OpenAI thread id and display name) in a SQLite
+    database, so every worker process sees the same threads and they survive
+    restarts.
+
+    The database runs in WAL mode so readers never block the writer. Found
+    threads are cached in-process for `cache_ttl` seconds. Misses are not
+    cached, so a thread created by another worker is visible right away.
+    """
+
+    def __init__(self, path, cache_ttl=5.0, cache_size=1024):
+        """
+        Args:
+            path (str): SQLite database file
+            cache_ttl (float): Seconds a looked-up thread is served from memory
+            cache_size (int): Threads kept in the read cache
+        """
+        self.path = path
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._connections = SQLiteConnections(path)
+        self._cache = {}  # thread id -> (row, expires_at)
+        self._cache_lock = threading.Lock()
+
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS threads ("
+            " id TEXT PRIMARY KEY,"
+            " name TEXT NOT NULL,"
+            " created_at TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS threads_created_at ON threads (created_at)")
+        conn.commit()
+
+    def _connection(self):
+        return self._connections.get()
+
+    def add(self, thread_id, name):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO threads (id, name, created_at) VALUES (?, ?, ?)",
+                (thread_id, name, datetime.utcnow().isoformat())
+            )
+
+    def get(self, thread_id):
+        """
+        Return {"id", "name"} for a thread, or None if it does not exist.
+        """
+        entry = self._cache.get(thread_id)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        row = self._connection().execute(
+            "SELECT id, name FROM threads WHERE id = ?", (thread_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        thread = {"id": row[0], "name": row[1]}
+        with self._cache_lock:
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[thread_id] = (thread, time.monotonic() + self.cache_ttl)
+        return thread
+
+    def list(self):
+        """
+        All threads as {"id", "name"} dicts, oldest first.
+        """
+        rows = self._connection().execute(
+            "SELECT id, name FROM threads ORDER BY created_at"
+        ).fetchall()
+        return [{"id": thread_id, "name": name} for thread_id, name in rows]
+
+    def delete(self, thread_id):
+        """
+        Remove a thread. Returns False if it did not exist.
+        """
+        with self._cache_lock:
+            self._cache.pop(thread_id, None)
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM threads WHERE id = ?", (thread_id,))
+        return cursor.rowcount > 0
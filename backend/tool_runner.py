@@ -0,0 +1,139 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class ToolTask:
+    """
+    One tool call submitted to a ToolPool.
+
+    The call may wait up to `timeout` seconds for a free worker, and then run
+    for up to `timeout` seconds from the moment it starts, so time spent
+    queued behind other runs' calls does not count against its run time.
+    """
+
+    def __init__(self, tool_call, timeout):
+        self.tool_call = tool_call
+        self.timeout = timeout
+        self.submitted = time.monotonic()
+        self.started = None  # Set by the worker thread
+        self.future = None
+        self.rejected = False
+
+    def remaining(self):
+        """
+        Seconds left before the current deadline: the queueing deadline until
+        the call starts, the run deadline afterwards.
+        """
+        start = self.started if self.started is not None else self.submitted
+        return max(0.0, start + self.timeout - time.monotonic())
+
+    def wait(self):
+        """
+        Block until the call finishes or its deadline passes.
+        """
+        while self.future is not None and not self.future.done():
+            remaining = self.remaining()
+            if remaining <= 0:
+                return
+            try:
+                self.future.result(timeout=remaining)
+            except FutureTimeoutError:
+                continue  # The call may have started meanwhile, moving its deadline
+            except Exception:
+                return
+
+    async def wait_async(self):
+        """
+        asyncio version of wait(); holds no thread while waiting.
+        """
+        if self.future is None:
+            return
+        waiter = asyncio.wrap_future(self.future)
+        while not waiter.done():
+            remaining = self.remaining()
+            if remaining <= 0:
+                return
+            await asyncio.wait([waiter], timeout=remaining)
+
+    def output(self):
+        """
+        The JSON output to submit for the call; an error object if it was
+        rejected, failed or is past its deadline. Call after wait().
+        """
+        name = self.tool_call.function.name
+        if self.rejected:
+            return json.dumps({"error": f"Tool {name} was not run: too many tool calls are "
+                                        f"in progress; try again"})
+        if not self.future.done():
+            self.future.cancel()
+            if self.started is None:
+                return json.dumps({"error": f"Tool {name} waited {self.timeout:g} seconds "
+                                            f"for a free worker and was not run"})
+            return json.dumps({"error": f"Tool {name} timed out after {self.timeout:g} seconds"})
+        if self.future.cancelled():
+            return json.dumps({"error": f"Tool {name} was cancelled"})
+        if self.future.exception() is not None:
+            return json.dumps({"error": f"Tool {name} failed: {str(self.future.exception())}"})
+        return self.future.result()
+
+
+class ToolPool:
+    """
+    Bounded thread pool for the assistant's tool calls, shared by all runs.
+
+    At most `max_pending` calls are queued or running at once; further calls
+    are rejected immediately instead of queueing behind them. A call past its
+    deadline keeps its thread until it returns (threads cannot be stopped)
+    and counts against `max_pending` until then.
+    """
+
+    def __init__(self, call, max_workers=4, max_pending=32, timeout=30.0):
+        """
+        Args:
+            call (callable): Runs one tool call and returns its output string
+            max_workers (int): Calls running at the same time
+            max_pending (int): Calls queued or running before new ones are rejected
+            timeout (float): Seconds a call may wait for a worker, and may run
+        """
+        self.call = call
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tool')
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        self.rejected = 0
+
+    def submit(self, tool_call):
+        """
+        Queue a tool call.
+
+        Returns:
+            ToolTask: The call; already rejected if the pool is saturated
+        """
+        task = ToolTask(tool_call, self.timeout)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                task.rejected = True
+                self.rejected += 1
+                return task
+            self._pending += 1
+        task.future = self._executor.submit(self._run, task)
+        # Runs on completion and on cancellation of a queued call alike
+        task.future.add_done_callback(self._finished)
+        return task
+
+    def _run(self, task):
+        task.started = time.monotonic()
+        return self.call(task.tool_call)
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    @property
+    def pending(self):
+        return self._pending
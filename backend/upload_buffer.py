@@ -0,0 +1,153 @@
+import hashlib
+import io
+import os
+import threading
+import uuid
+
+
+class MemoryBudget:
+    """
+    Bytes of upload data that all live UploadBuffers together may keep in memory.
+    """
+
+    def __init__(self, limit):
+        """
+        Args:
+            limit (int): Total bytes the buffers may hold in memory
+        """
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+        self.spills = 0  # Buffers sent to disk because the budget was used up
+
+    def reserve(self, size):
+        """
+        Claim `size` bytes. Returns False, claiming nothing, if that would exceed the limit.
+        """
+        with self._lock:
+            if self.used + size > self.limit:
+                return False
+            self.used += size
+            return True
+
+    def release(self, size):
+        with self._lock:
+            self.used -= size
+
+
+class UploadBuffer:
+    """
+    The bytes of one uploaded file, kept in memory up to `spill_bytes` and in
+    a temporary file beyond that, or once the shared MemoryBudget is used up.
+
+    The SHA-256 is computed while the upload is copied in, and the vector
+    store upload and the text extractor both read from this one buffer, so a
+    small upload never touches the disk.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, filename, directory, spill_bytes, budget=None):
+        """
+        Args:
+            filename (str): Sanitized name of the uploaded file
+            directory (str): Where the buffer spills to once it outgrows memory
+            spill_bytes (int): Largest upload kept in memory
+            budget (MemoryBudget): Optional limit shared with other buffers
+        """
+        self.filename = filename
+        self.directory = directory
+        self.spill_bytes = spill_bytes
+        self.budget = budget
+        self._reserved = 0  # Bytes claimed from the budget
+        self.path = None  # Set once spilled to disk
+        self.size = 0
+        self.sha256 = None
+        self._memory = io.BytesIO()
+        self._data = None
+        self._file = None
+        self._digest = hashlib.sha256()
+
+    @classmethod
+    def from_stream(cls, stream, filename, directory, spill_bytes, budget=None):
+        """
+        Copy a readable binary stream (such as an uploaded file) into a new buffer.
+        """
+        buffer = cls(filename, directory, spill_bytes, budget)
+        try:
+            for chunk in iter(lambda: stream.read(cls.CHUNK_SIZE), b''):
+                buffer.write(chunk)
+            buffer.finish()
+        except BaseException:
+            buffer.close()
+            raise
+        return buffer
+
+    def write(self, chunk):
+        self._digest.update(chunk)
+        if self._file is None and (self.size + len(chunk) > self.spill_bytes or not self._reserve(len(chunk))):
+            # Too large for memory: move what we have to disk and continue there
+            if self.budget is not None and self.size + len(chunk) <= self.spill_bytes:
+                self.budget.spills += 1
+            self.path = os.path.join(self.directory, f"{uuid.uuid4().hex}_{self.filename}")
+            self._file = open(self.path, 'wb')
+            self._file.write(self._memory.getbuffer())
+            self._memory = None
+            self._release()
+        (self._file or self._memory).write(chunk)
+        self.size += len(chunk)
+
+    def _reserve(self, size):
+        if self.budget is None:
+            return True
+        if not self.budget.reserve(size):
+            return False
+        self._reserved += size
+        return True
+
+    def _release(self):
+        if self._reserved:
+            self.budget.release(self._reserved)
+            self._reserved = 0
+
+    def finish(self):
+        self.sha256 = self._digest.hexdigest()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        else:
+            self._data = self._memory.getvalue()
+            self._memory = None
+
+    @property
+    def in_memory(self):
+        return self.path is None
+
+    def open(self):
+        """
+        A new binary file object over the contents; each reader gets its own.
+        """
+        if self.path is not None:
+            return open(self.path, 'rb')
+        return io.BytesIO(self._data)
+
+    def source(self):
+        """
+        The contents as something PageExtractor accepts: the spill file path,
+        or the bytes themselves.
+        """
+        return self.path if self.path is not None else self._data
+
+    def close(self):
+        """
+        Release the memory or remove the spill file.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+        self._data = None
+        self._memory = None
+        self._release()
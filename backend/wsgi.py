@@ -0,0 +1,21 @@
+"""
+Production entry point for a pre-forking WSGI server (see gunicorn.conf.py).
+
+Importing this module loads the embedding model, the resident embedding
+index and the ANN index before returning, so a server started with
+preload_app forks workers that share those pages copy-on-write instead of
+each loading its own copy.
+"""
+import gc
+
+from api import app, warm_start_thread
+
+# Block until the model and indexes are loaded; forking mid-load would hand
+# workers half-initialized state
+warm_start_thread.join()
+
+# Move everything loaded so far out of the collector's reach, so garbage
+# collection in the workers does not touch (and un-share) these pages
+gc.freeze()
+
+__all__ = ['app']
@@ -0,0 +1,56 @@
+"""
+Send many /ask requests at once and report how long they take, to compare the
+threaded Flask server with the asyncio /ask of asgi.py.
+
+Start the stub with a slow run, then the backend under test:
+    python benchmarks/openai_stub.py --port 8011 --run-seconds 2
+    cd backend
+    OPENAI_BASE_URL=http://127.0.0.1:8011/v1 OPENAI_API_KEY=stub uvicorn asgi:app --port 5500
+
+Usage: python benchmarks/bench_concurrent_ask.py [--url http://127.0.0.1:5500] [--requests 200]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+async def ask(client, url, thread_id, i):
+    start = time.perf_counter()
+    response = await client.post(f"{url}/ask", json={"question": f"question {i}", "thread_id": thread_id})
+    return response.status_code, time.perf_counter() - start
+
+
+async def main(url, requests, threads):
+    limits = httpx.Limits(max_connections=requests, max_keepalive_connections=requests)
+    async with httpx.AsyncClient(timeout=600, limits=limits) as client:
+        thread_ids = []
+        for i in range(threads):
+            response = await client.post(f"{url}/threads", json={"name": f"bench {i}"})
+            response.raise_for_status()
+            thread_ids.append(response.json()["thread_id"])
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            ask(client, url, thread_ids[i % threads], i) for i in range(requests)))
+        wall = time.perf_counter() - start
+
+        for thread_id in thread_ids:
+            await client.delete(f"{url}/threads/{thread_id}")
+
+    latencies = sorted(seconds for _, seconds in results)
+    ok = sum(1 for status, _ in results if status == 200)
+    print(f"{requests} requests, {ok} succeeded, wall {wall:.2f} s")
+    print(f"latency p50 {latencies[len(latencies) // 2]:.2f} s, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} s, max {latencies[-1]:.2f} s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5500')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=None,
+                        help="Conversation threads to spread the questions over (default: one per request)")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.requests, args.threads or args.requests))
@@ -0,0 +1,75 @@
+"""
+Build a KeywordIndex over a synthetic corpus and time BM25 top-K queries.
+
+Document terms follow a Zipf distribution over a fixed vocabulary, like word
+frequencies in real RFPs, and are added in batches so the index goes through
+its segment merges.
+
+Usage: python benchmarks/bench_keyword_search.py [--documents 100000] [--queries 500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from keyword_index import KeywordIndex  # noqa: E402
+from similarity import top_scores  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--terms-per-document', type=int, default=200)
+    parser.add_argument('--vocabulary', type=int, default=50000)
+    parser.add_argument('--batch', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vocabulary = np.array([f"t{i}" for i in range(args.vocabulary)], dtype=object)
+
+    def term_ids(count):
+        return np.minimum(rng.zipf(1.2, count), args.vocabulary) - 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = KeywordIndex(directory)
+        start = time.perf_counter()
+        for first in range(0, args.documents, args.batch):
+            rows = range(first, min(first + args.batch, args.documents))
+            lengths = rng.integers(args.terms_per_document // 2, args.terms_per_document * 3 // 2, len(rows))
+            terms = vocabulary[term_ids(int(lengths.sum()))].tolist()
+            bounds = np.concatenate(([0], np.cumsum(lengths)))
+            index.add([(row, terms[bounds[i]:bounds[i + 1]]) for i, row in enumerate(rows)])
+        build_seconds = time.perf_counter() - start
+
+        stats = index.stats()
+        print(f"{stats['documents']} documents, {stats['segments']} segments, "
+              f"{stats['segment_terms']} segment terms, {stats['postings']} postings "
+              f"in {build_seconds:.1f} s")
+        print(f"memory {stats['memory_bytes'] / 2**20:.1f} MiB, disk {stats['disk_bytes'] / 2**20:.1f} MiB")
+
+        start = time.perf_counter()
+        KeywordIndex(directory)
+        print(f"load {time.perf_counter() - start:.2f} s")
+
+        # Queries of 1-4 terms; rare terms are likelier to be asked about, common ones still occur
+        queries = [' '.join(vocabulary[term_ids(rng.integers(1, 5))]) for _ in range(args.queries)]
+        view = index.snapshot()
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            top_scores(index.scores(query, view), args.k)
+            timings.append(time.perf_counter() - start)
+        timings = np.array(timings) * 1000
+        print(f"top-{args.k} query: p50 {np.percentile(timings, 50):.2f} ms  "
+              f"p95 {np.percentile(timings, 95):.2f} ms  max {timings.max():.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Compare the embedding cost of an upload before and after the shared model
+registry: the old path built a new SentenceTransformer for every upload, the
+new path reuses the model loaded once at startup.
+
+Usage: python benchmarks/bench_model_registry.py [uploads]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from sentence_transformers import SentenceTransformer  # noqa: E402
+
+from model_registry import DEFAULT_MODEL_NAME, get_model  # noqa: E402
+
+
+SAMPLE_TEXT = "Request for proposal for the supply of network infrastructure. " * 200
+
+
+def per_request_model():
+    model = SentenceTransformer(DEFAULT_MODEL_NAME)
+    return model.encode(SAMPLE_TEXT)
+
+
+def shared_model():
+    return get_model().encode(SAMPLE_TEXT)
+
+
+def measure(fn, uploads):
+    timings = []
+    for _ in range(uploads):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    uploads = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    # Warm start: the server loads the model before accepting uploads
+    get_model()
+
+    for label, fn in (("before (model per upload)", per_request_model),
+                      ("after (shared registry)", shared_model)):
+        timings = measure(fn, uploads)
+        print(f"{label:28s} mean {statistics.mean(timings) * 1000:9.1f} ms"
+              f"  p50 {statistics.median(timings) * 1000:9.1f} ms"
+              f"  max {max(timings) * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Compare the original upload text extraction (pdfplumber, every page
+extracted twice, serially) with PageExtractor at several worker counts, on a
+large synthetic RFP.
+
+Usage: python benchmarks/bench_pdf_extraction.py [--pages 300] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pdfplumber
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from pdf_text import PageExtractor  # noqa: E402
+from synthetic import make_rfp_pdf  # noqa: E402
+
+
+def legacy_extract(path):
+    """upload_file's extraction before this change."""
+    with pdfplumber.open(path) as pdf:
+        pages = pdf.pages
+        return '\n'.join([page.extract_text()
+                          for page in pages if page.extract_text()])
+
+
+def best_of(fn, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeats', type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'rfp.pdf')
+        with open(path, 'wb') as f:
+            f.write(make_rfp_pdf(0, args.pages))
+
+        print(f"{args.pages} pages, {os.cpu_count()} CPUs")
+        legacy_seconds, expected = best_of(lambda: legacy_extract(path), args.repeats)
+        print(f"{'legacy (twice per page)':>26s} {legacy_seconds:8.2f} s")
+
+        for workers in args.workers:
+            extractor = PageExtractor(workers=workers, parallel_min_pages=1)
+            extractor.extract(path)  # Start the pool outside the timing
+            seconds, (text, page_seconds) = best_of(lambda: extractor.extract(path), args.repeats)
+            assert text == expected, "extracted text differs from the legacy extraction"
+            print(f"{f'{workers} worker(s)':>26s} {seconds:8.2f} s  "
+                  f"x{legacy_seconds / seconds:5.2f}  slowest page {max(page_seconds) * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
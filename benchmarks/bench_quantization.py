@@ -0,0 +1,89 @@
+"""
+Compare float32, float16 and int8 resident indexes on a synthetic corpus:
+memory of the search vectors, top-K scan latency and recall@K against the
+exact float32 results, with and without the full-precision re-rank.
+
+Usage: python benchmarks/bench_quantization.py [--documents 100000] [--queries 200] [--ann]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from synthetic import write_corpus  # noqa: E402
+from ann_index import AnnIndex  # noqa: E402
+from index_cache import IndexCache  # noqa: E402
+from quantization import RERANK_FACTOR  # noqa: E402
+from similarity import top_k  # noqa: E402
+
+
+def recall(expected, found):
+    return np.mean([len(set(e) & set(f)) / len(e) for e, f in zip(expected, found)])
+
+
+def run(search, query_rows):
+    """Results and per-query milliseconds of search(row) over the query rows."""
+    results, timings = [], []
+    for row in query_rows:
+        start = time.perf_counter()
+        rows, _ = search(row)
+        timings.append(time.perf_counter() - start)
+        results.append(rows.tolist())
+    return results, np.array(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--rerank-factor', type=int, default=RERANK_FACTOR)
+    parser.add_argument('--ann', action='store_true', help="Also build and compare HNSW indexes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = write_corpus(directory, args.documents)
+        query_rows = np.random.default_rng(1).choice(args.documents, args.queries, replace=False)
+
+        exact = IndexCache(store, precision='float32').snapshot()
+        expected, _ = run(lambda row: top_k(exact.matrix, exact.matrix[row], args.k, exclude_rows=[row]),
+                          query_rows)
+
+        print(f"{args.documents} documents, top-{args.k}, re-rank factor {args.rerank_factor}")
+        for precision in ('float32', 'float16', 'int8'):
+            rerank_factors = [1] if precision == 'float32' else [1, args.rerank_factor]
+            for factor in rerank_factors:
+                cache = IndexCache(store, precision=precision, rerank_factor=factor)
+                snapshot = cache.snapshot()
+                found, timings = run(
+                    lambda row: top_k(snapshot.matrix, snapshot.matrix[row], args.k, exclude_rows=[row]),
+                    query_rows)
+                label = precision if precision == 'float32' else f"{precision} x{factor}"
+                print(f"scan {label:<11} {cache.vector_bytes() / 2**20:7.1f} MiB  "
+                      f"p50 {np.percentile(timings, 50):6.2f} ms  p95 {np.percentile(timings, 95):6.2f} ms  "
+                      f"recall@{args.k} {recall(expected, found):.4f}")
+
+            if args.ann:
+                snapshot = IndexCache(store, precision=precision).snapshot()
+                ann = AnnIndex(os.path.join(directory, f"ann-{precision}.hnsw"), min_rows=0,
+                               precision=precision, rerank_factor=args.rerank_factor)
+                start = time.perf_counter()
+                ann.sync(snapshot)
+                build_seconds = time.perf_counter() - start
+                found, timings = run(
+                    lambda row: ann.search(snapshot, snapshot.matrix[row], args.k, exclude_rows=[row]),
+                    query_rows)
+                ann.save()
+                print(f"hnsw {precision:<11} {os.path.getsize(ann.path) / 2**20:7.1f} MiB  "
+                      f"p50 {np.percentile(timings, 50):6.2f} ms  p95 {np.percentile(timings, 95):6.2f} ms  "
+                      f"recall@{args.k} {recall(expected, found):.4f}  (built in {build_seconds:.0f} s)")
+
+
+if __name__ == '__main__':
+    main()
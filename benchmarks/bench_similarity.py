@@ -0,0 +1,91 @@
+"""
+Compare the vectorized top-K search used by ir_stuff with the original
+per-document loop over sklearn cosine_similarity, on random corpora, and
+BATCH ir_stuff calls with one ir_stuff_batch call.
+
+Usage: python benchmarks/bench_similarity.py [corpus sizes...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from similarity import batch_top_k, normalize_rows, top_k  # noqa: E402
+
+
+DIM = 384
+K = 5
+BATCH = 20
+
+
+def legacy_loop(embeddings, query_row, k):
+    """The ir_stuff loop before vectorization, minus the JSON parsing."""
+    query_embedding = np.array(embeddings[query_row])
+    similarities = []
+    for row, doc in enumerate(embeddings):
+        if row == query_row:
+            continue
+        similarity = cosine_similarity(
+            query_embedding.reshape(1, -1),
+            np.array(doc).reshape(1, -1)
+        )[0][0]
+        similarities.append((float(similarity), row))
+    similarities.sort(reverse=True)
+    return [row for _, row in similarities[:k]]
+
+
+def vectorized(normalized, query_row, k):
+    rows, _ = top_k(normalized, normalized[query_row], k, exclude_rows=[query_row])
+    return rows.tolist()
+
+
+def one_by_one(normalized, query_rows, k):
+    return [vectorized(normalized, row, k) for row in query_rows]
+
+
+def batched(normalized, query_rows, k):
+    return [rows.tolist() for rows, _ in batch_top_k(normalized, query_rows, k)]
+
+
+def timed(fn, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [1000, 10000, 100000]
+    rng = np.random.default_rng(0)
+
+    for n in sizes:
+        matrix = rng.standard_normal((n, DIM)).astype(np.float32)
+        normalized = normalize_rows(matrix)
+        query_row = int(rng.integers(n))
+
+        fast_time, fast_rows = timed(vectorized, normalized, query_row, K)
+        line = f"n={n:>7d}  vectorized {fast_time * 1000:8.2f} ms"
+
+        # The loop takes minutes at 100k documents; only run it on smaller corpora
+        if n <= 20000:
+            loop_time, loop_rows = timed(legacy_loop, matrix.tolist(), query_row, K, repeat=1)
+            line += (f"  loop {loop_time * 1000:10.1f} ms  speed-up {loop_time / fast_time:7.0f}x"
+                     f"  same results: {loop_rows == fast_rows}")
+        print(line)
+
+        query_rows = rng.choice(n, size=BATCH, replace=False)
+        single_time, single_rows = timed(one_by_one, normalized, query_rows, K)
+        batch_time, batch_rows = timed(batched, normalized, query_rows, K)
+        print(f"{'':9s}  {BATCH} queries: one by one {single_time * 1000:8.2f} ms  "
+              f"batched {batch_time * 1000:8.2f} ms  speed-up {single_time / batch_time:5.1f}x"
+              f"  same results: {single_rows == batch_rows}")
+
+
+if __name__ == '__main__':
+    main()
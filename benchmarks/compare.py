@@ -0,0 +1,67 @@
+"""
+Compare two run_benchmarks.py result files, metric by metric.
+
+Times (keys ending in _ms or seconds) are better when lower, rates (per_second)
+when higher. Exits with status 1 if any metric is worse than --threshold.
+
+Usage: python benchmarks/compare.py base.json head.json [--threshold 0.1]
+"""
+import argparse
+import json
+import sys
+
+
+def flatten(tree, prefix=''):
+    for key, value in tree.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+
+def direction(path):
+    """
+    +1 if larger is better, -1 if smaller is better, 0 if not a performance metric.
+    """
+    name = path.rsplit('.', 1)[-1]
+    if name.endswith('per_second'):
+        return 1
+    if name.endswith('_ms') or name.endswith('seconds'):
+        return -1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="Relative change reported as a regression (default 0.1 = 10%%)")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    print(f"base {base['environment'].get('commit')}  head {head['environment'].get('commit')}")
+    base_metrics = dict(flatten(base["results"]))
+    regressions = 0
+    for path, new in flatten(head["results"]):
+        sign = direction(path)
+        old = base_metrics.get(path)
+        if sign == 0 or old is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        worse = sign * change < -args.threshold
+        better = sign * change > args.threshold
+        regressions += worse
+        flag = "REGRESSION" if worse else ("improved" if better else "")
+        print(f"{path:70s} {old:12.4f} {new:12.4f} {change:+8.1%}  {flag}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
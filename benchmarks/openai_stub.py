@@ -0,0 +1,302 @@
+"""
+Local stand-in for the parts of the OpenAI Assistants, Files and Vector
+Stores APIs the backend uses, so /ask, /askStream and uploads can be
+exercised offline.
+
+The stub answers every question by echoing it. A question containing
+"similar to <title>" first makes the run call the ir_stuff tool with that
+title, then answers with the tool output.
+
+Uploaded files are counted and dropped; a file batch completes after
+--index-seconds.
+
+Usage:
+    python benchmarks/openai_stub.py [--port 8011] [--run-seconds 0.0] [--index-seconds 0.0]
+    OPENAI_BASE_URL=http://127.0.0.1:8011/v1 OPENAI_API_KEY=stub python api.py
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+
+app = Flask(__name__)
+
+RUN_SECONDS = 0.0  # Simulated model latency before a run leaves "in_progress"
+TOKEN_SECONDS = 0.0  # Simulated delay between streamed tokens
+INDEX_SECONDS = 0.0  # Simulated vector store indexing time per file batch
+
+threads = {}  # thread id -> list of messages, oldest first
+runs = {}  # run id -> run state
+files = {}  # file id -> file object
+file_batches = {}  # batch id -> (batch object, created at)
+assistant_tools = {}  # assistant id -> tools set through update
+lock = threading.Lock()
+
+
+def new_id(prefix):
+    return f"{prefix}_{uuid.uuid4().hex[:24]}"
+
+
+def message_object(thread_id, role, text):
+    return {
+        "id": new_id("msg"),
+        "object": "thread.message",
+        "created_at": int(time.time()),
+        "thread_id": thread_id,
+        "role": role,
+        "status": "completed",
+        "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+        "metadata": {}
+    }
+
+
+def run_object(run):
+    data = {
+        "id": run["id"],
+        "object": "thread.run",
+        "created_at": int(run["created_at"]),
+        "thread_id": run["thread_id"],
+        "assistant_id": run["assistant_id"],
+        "status": run["status"],
+        "required_action": None,
+        "metadata": {}
+    }
+    if run["status"] == "requires_action":
+        data["required_action"] = {
+            "type": "submit_tool_outputs",
+            "submit_tool_outputs": {"tool_calls": run["tool_calls"]}
+        }
+    return data
+
+
+def plan_run(run):
+    """
+    Decide what the run does next: call ir_stuff once, then answer.
+    """
+    question = run["question"]
+    if "similar to " in question and run["tool_outputs"] is None:
+        title = question.split("similar to ", 1)[1].strip().rstrip("?.")
+        run["tool_calls"] = [{
+            "id": new_id("call"),
+            "type": "function",
+            "function": {"name": "ir_stuff", "arguments": json.dumps({"filename": title, "k": 3})}
+        }]
+        return "requires_action"
+    return "completed"
+
+
+def answer_for(run):
+    if run["tool_outputs"]:
+        return "Similar documents: " + " ".join(output["output"] for output in run["tool_outputs"])
+    return f"You asked: {run['question']}"
+
+
+def finish_run(run):
+    status = plan_run(run)
+    run["status"] = status
+    if status == "completed":
+        with lock:
+            threads[run["thread_id"]].append(message_object(run["thread_id"], "assistant", answer_for(run)))
+
+
+@app.route('/v1/assistants/<assistant_id>', methods=['GET', 'POST'])
+def retrieve_assistant(assistant_id):
+    with lock:
+        if request.method == 'POST' and "tools" in request.get_json():
+            assistant_tools[assistant_id] = request.get_json()["tools"]
+        tools = assistant_tools.get(assistant_id, [{"type": "file_search"}])
+    return jsonify({"id": assistant_id, "object": "assistant", "created_at": 0,
+                    "model": "stub", "name": "stub", "tools": tools, "metadata": {}})
+
+
+@app.route('/v1/vector_stores/<vector_store_id>', methods=['GET'])
+def retrieve_vector_store(vector_store_id):
+    with lock:
+        completed = sum(batch["file_counts"]["completed"] for batch, _ in file_batches.values()
+                        if batch["vector_store_id"] == vector_store_id)
+    return jsonify({"id": vector_store_id, "object": "vector_store", "created_at": 0,
+                    "name": "stub", "status": "completed", "usage_bytes": 0, "metadata": {},
+                    "last_active_at": None,
+                    "file_counts": {"in_progress": 0, "completed": completed, "failed": 0,
+                                    "cancelled": 0, "total": completed}})
+
+
+@app.route('/v1/files', methods=['POST'])
+def create_file():
+    upload = request.files['file']
+    size = len(upload.read())
+    file_object = {"id": new_id("file"), "object": "file", "bytes": size,
+                   "created_at": int(time.time()), "filename": upload.filename,
+                   "purpose": request.form.get("purpose", "assistants"), "status": "processed"}
+    with lock:
+        files[file_object["id"]] = file_object
+    return jsonify(file_object)
+
+
+def batch_object(batch, created_at):
+    total = batch["file_counts"]["total"]
+    done = time.time() - created_at >= INDEX_SECONDS
+    batch["status"] = "completed" if done else "in_progress"
+    batch["file_counts"].update(completed=total if done else 0, in_progress=0 if done else total)
+    return batch
+
+
+@app.route('/v1/vector_stores/<vector_store_id>/file_batches', methods=['POST'])
+def create_file_batch(vector_store_id):
+    file_ids = request.get_json()["file_ids"]
+    missing = [file_id for file_id in file_ids if file_id not in files]
+    if missing:
+        return jsonify({"error": {"message": f"No file found with id {missing[0]}"}}), 404
+    batch = {"id": new_id("vsfb"), "object": "vector_store.file_batch", "created_at": int(time.time()),
+             "vector_store_id": vector_store_id, "status": "in_progress",
+             "file_counts": {"in_progress": len(file_ids), "completed": 0, "failed": 0,
+                             "cancelled": 0, "total": len(file_ids)}}
+    created_at = time.time()
+    with lock:
+        file_batches[batch["id"]] = (batch, created_at)
+    return jsonify(batch_object(batch, created_at))
+
+
+@app.route('/v1/vector_stores/<vector_store_id>/file_batches/<batch_id>', methods=['GET'])
+def retrieve_file_batch(vector_store_id, batch_id):
+    entry = file_batches.get(batch_id)
+    if entry is None:
+        return jsonify({"error": {"message": "No file batch found"}}), 404
+    response = jsonify(batch_object(*entry))
+    # The SDK polls every second unless told otherwise
+    response.headers['openai-poll-after-ms'] = '50'
+    return response
+
+
+@app.route('/v1/threads', methods=['POST'])
+def create_thread():
+    thread_id = new_id("thread")
+    with lock:
+        threads[thread_id] = []
+    return jsonify({"id": thread_id, "object": "thread", "created_at": int(time.time()), "metadata": {}})
+
+
+@app.route('/v1/threads/<thread_id>/messages', methods=['GET', 'POST'])
+def thread_messages(thread_id):
+    if thread_id not in threads:
+        return jsonify({"error": {"message": "No thread found"}}), 404
+    if request.method == 'POST':
+        body = request.get_json()
+        message = message_object(thread_id, body.get("role", "user"), body["content"])
+        with lock:
+            threads[thread_id].append(message)
+        return jsonify(message)
+    data = list(reversed(threads[thread_id]))
+    return jsonify({"object": "list", "data": data, "has_more": False,
+                    "first_id": data[0]["id"] if data else None,
+                    "last_id": data[-1]["id"] if data else None})
+
+
+@app.route('/v1/threads/<thread_id>/runs', methods=['POST'])
+def create_run(thread_id):
+    if thread_id not in threads:
+        return jsonify({"error": {"message": "No thread found"}}), 404
+    body = request.get_json()
+    user_messages = [m for m in threads[thread_id] if m["role"] == "user"]
+    run = {
+        "id": new_id("run"),
+        "thread_id": thread_id,
+        "assistant_id": body["assistant_id"],
+        "created_at": time.time(),
+        "status": "queued",
+        "question": user_messages[-1]["content"][0]["text"]["value"] if user_messages else "",
+        "tool_calls": [],
+        "tool_outputs": None
+    }
+    with lock:
+        runs[run["id"]] = run
+    if body.get("stream"):
+        return stream_run(run)
+    return jsonify(run_object(run))
+
+
+@app.route('/v1/threads/<thread_id>/runs/<run_id>', methods=['GET'])
+def retrieve_run(thread_id, run_id):
+    run = runs.get(run_id)
+    if run is None:
+        return jsonify({"error": {"message": "No run found"}}), 404
+    if run["status"] in ("queued", "in_progress"):
+        if time.time() - run["created_at"] >= RUN_SECONDS:
+            finish_run(run)
+        else:
+            run["status"] = "in_progress"
+    return jsonify(run_object(run))
+
+
+@app.route('/v1/threads/<thread_id>/runs/<run_id>/submit_tool_outputs', methods=['POST'])
+def submit_tool_outputs(thread_id, run_id):
+    run = runs.get(run_id)
+    if run is None or run["status"] != "requires_action":
+        return jsonify({"error": {"message": "Run is not waiting for tool outputs"}}), 400
+    body = request.get_json()
+    run["tool_outputs"] = body["tool_outputs"]
+    run["status"] = "queued"
+    run["created_at"] = time.time()
+    if body.get("stream"):
+        return stream_run(run)
+    return jsonify(run_object(run))
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_run(run):
+    """
+    Relay a run as Assistants API server-sent events.
+    """
+    def generate():
+        yield sse("thread.run.created", run_object(run))
+        time.sleep(RUN_SECONDS)
+        status = plan_run(run)
+        run["status"] = status
+        if status == "requires_action":
+            yield sse("thread.run.requires_action", run_object(run))
+            yield "event: done\ndata: [DONE]\n\n"
+            return
+
+        answer = answer_for(run)
+        message = message_object(run["thread_id"], "assistant", answer)
+        with lock:
+            threads[run["thread_id"]].append(message)
+        yield sse("thread.message.created", {**message, "status": "in_progress"})
+        for word in answer.split(" "):
+            time.sleep(TOKEN_SECONDS)
+            yield sse("thread.message.delta", {
+                "id": message["id"],
+                "object": "thread.message.delta",
+                "delta": {"content": [{"index": 0, "type": "text", "text": {"value": word + " "}}]}
+            })
+        yield sse("thread.message.completed", message)
+        yield sse("thread.run.completed", run_object(run))
+        yield "event: done\ndata: [DONE]\n\n"
+
+    return Response(generate(), mimetype='text/event-stream')
+
+
+def main():
+    global RUN_SECONDS, TOKEN_SECONDS, INDEX_SECONDS
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8011)
+    parser.add_argument('--run-seconds', type=float, default=0.0)
+    parser.add_argument('--token-seconds', type=float, default=0.0)
+    parser.add_argument('--index-seconds', type=float, default=0.0)
+    args = parser.parse_args()
+    RUN_SECONDS = args.run_seconds
+    TOKEN_SECONDS = args.token_seconds
+    INDEX_SECONDS = args.index_seconds
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
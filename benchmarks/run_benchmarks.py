@@ -0,0 +1,349 @@
+"""
+Benchmark suite for ingestion and retrieval, runnable offline.
+
+- ir_stuff: latency on synthetic corpora (uncached, result-cached and
+  restricted to one category)
+- upload: /uploadFile and /uploadFiles throughput against the local OpenAI stub
+- preprocess: RFPPreprocessor stage times on a synthetic RFP
+
+Each benchmark runs in a fresh process with its own working directory, so
+the backend starts as it would in production. The results are written as one
+JSON document; compare two runs with compare.py.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 1000 10000 100000] [--uploads 50]
+        [--only ir_stuff upload preprocess] [--output results.json]
+    python benchmarks/compare.py base.json head.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import synthetic  # noqa: E402
+
+
+def percentiles(seconds):
+    values = np.asarray(seconds) * 1000
+    return {
+        "mean_ms": round(float(values.mean()), 4),
+        "p50_ms": round(float(np.percentile(values, 50)), 4),
+        "p95_ms": round(float(np.percentile(values, 95)), 4),
+        "max_ms": round(float(values.max()), 4)
+    }
+
+
+def import_backend(workdir):
+    """
+    Import the backend with `workdir` as its working directory and wait for
+    the warm start. Returns (api module, startup seconds).
+    """
+    os.chdir(workdir)
+    os.environ.setdefault('OPENAI_API_KEY', 'stub')
+    sys.path.insert(0, os.path.join(REPO_DIR, 'backend'))
+    start = time.perf_counter()
+    import api
+    api.warm_start_thread.join()
+    return api, time.perf_counter() - start
+
+
+# Workers: run in a child process, return a JSON-serializable dict
+
+def bench_ir_stuff(workdir, size, queries, k):
+    api, startup = import_backend(workdir)
+    rng = np.random.default_rng(size)
+    titles = [synthetic.corpus_title(int(row)) for row in rng.choice(size, size=min(queries, size), replace=False)]
+
+    def run_pass(filters=api.NO_FILTERS):
+        timings = []
+        with api.app.app_context():
+            for title in titles:
+                start = time.perf_counter()
+                _, status_code = api.ir_stuff(title, k, filters)
+                timings.append(time.perf_counter() - start)
+                if status_code != 200:
+                    raise RuntimeError(f"ir_stuff({title!r}) returned {status_code}")
+        return timings
+
+    uncached = run_pass()  # Every title is new to the result cache
+    cached = run_pass()
+    # One category holds 1/len(CATEGORIES) of the corpus
+    filtered = run_pass(api.parse_filters({"category": synthetic.CATEGORIES[0]}))
+    snapshot = api.index_cache.snapshot()
+    return {
+        "documents": snapshot.count,
+        "k": k,
+        "queries": len(titles),
+        "search": "ann" if api.ann_index.size and snapshot.count >= api.ann_index.min_rows else "exact",
+        "startup_seconds": round(startup, 3),
+        "uncached": percentiles(uncached),
+        "cached": percentiles(cached),
+        "filtered": percentiles(filtered)
+    }
+
+
+def bench_upload(workdir, uploads, pages):
+    api, startup = import_backend(workdir)
+    client = api.app.test_client()
+
+    def wait(job_ids):
+        statuses = {}
+        while len(statuses) < len(job_ids):
+            for job_id in job_ids:
+                if job_id not in statuses:
+                    status = api.ingestion_jobs.status(job_id)
+                    if status["status"] in ('completed', 'failed'):
+                        statuses[job_id] = status
+            time.sleep(0.01)
+        return [statuses[job_id] for job_id in job_ids]
+
+    pdfs = [synthetic.make_rfp_pdf(seed, pages) for seed in range(2 * uploads)]
+
+    # One request per file
+    request_times = []
+    job_ids = []
+    start = time.perf_counter()
+    for seed, data in enumerate(pdfs[:uploads]):
+        request_start = time.perf_counter()
+        response = client.post('/uploadFile', content_type='multipart/form-data', data={
+            'file': (io.BytesIO(data), f"{synthetic.corpus_title(seed)}.pdf")})
+        request_times.append(time.perf_counter() - request_start)
+        if response.status_code != 202:
+            raise RuntimeError(f"/uploadFile returned {response.status_code}: {response.json}")
+        job_ids.append(response.json["job_id"])
+    jobs = wait(job_ids)
+    single_seconds = time.perf_counter() - start
+
+    stages = {}
+    for job in jobs:
+        for stage in job["stages"]:
+            stages.setdefault(stage["name"], []).append(stage["seconds"])
+
+    # The same number of new files in one batch request
+    start = time.perf_counter()
+    response = client.post('/uploadFiles', content_type='multipart/form-data', data={
+        'files': [(io.BytesIO(data), f"{synthetic.corpus_title(seed)}.pdf")
+                  for seed, data in enumerate(pdfs[uploads:], start=uploads)]})
+    if response.status_code != 202:
+        raise RuntimeError(f"/uploadFiles returned {response.status_code}: {response.json}")
+    batch_job = wait([response.json["job_id"]])[0]
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "files": uploads,
+        "pages_per_file": pages,
+        "startup_seconds": round(startup, 3),
+        "single": {
+            "seconds": round(single_seconds, 4),
+            "files_per_second": round(uploads / single_seconds, 3),
+            "failed": sum(1 for job in jobs if job["status"] != 'completed'),
+            "request": percentiles(request_times),
+            "stage_mean_ms": {name: round(1000 * sum(values) / len(values), 4)
+                              for name, values in stages.items()}
+        },
+        "batch": {
+            "seconds": round(batch_seconds, 4),
+            "files_per_second": round(uploads / batch_seconds, 3),
+            "failed": 0 if batch_job["status"] == 'completed' else uploads,
+            "stage_ms": {stage["name"]: round(1000 * stage["seconds"], 4)
+                         for stage in batch_job["stages"]}
+        }
+    }
+
+
+def bench_preprocess(workdir, pages, repeats):
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    pdf_path = os.path.join(workdir, 'rfp.pdf')
+    with open(pdf_path, 'wb') as f:
+        f.write(synthetic.make_rfp_pdf(0, pages))
+
+    # The preprocessor prints progress; keep it out of the results
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            start = time.perf_counter()
+            from rfp_preprocess import RFPPreprocessor
+            import_seconds = time.perf_counter() - start
+
+            runs = []
+            for _ in range(repeats):
+                timings = {}
+                start = time.perf_counter()
+                preprocessor = RFPPreprocessor(pdf_path)
+                timings["init"] = time.perf_counter() - start
+                # The steps of RFPPreprocessor.preprocess(), timed one by one
+                for stage in ('extract_text', 'chunk_text', 'normalize_text', 'extract_keywords',
+                              'tag_geography_category', 'generate_embeddings', 'build_faiss_index'):
+                    start = time.perf_counter()
+                    getattr(preprocessor, stage)()
+                    timings[stage] = time.perf_counter() - start
+                runs.append(timings)
+        finally:
+            sys.stdout = stdout
+
+    return {
+        "pages": pages,
+        "chunks": len(preprocessor.chunks),
+        "repeats": repeats,
+        "import_seconds": round(import_seconds, 3),
+        # The first run includes loading the embedding model in init
+        "first_run_ms": {stage: round(1000 * seconds, 4) for stage, seconds in runs[0].items()},
+        "stage_median_ms": {stage: round(1000 * float(np.median([run[stage] for run in runs])), 4)
+                            for stage in runs[0]}
+    }
+
+
+WORKERS = {
+    "ir_stuff": bench_ir_stuff,
+    "upload": bench_upload,
+    "preprocess": bench_preprocess,
+}
+
+
+# Parent process
+
+def run_worker(name, workdir, env=None, **kwargs):
+    """
+    Run one benchmark in a child process and return its result dict, or
+    {"error": ...} if it failed.
+    """
+    result_path = os.path.join(workdir, 'result.json')
+    command = [sys.executable, os.path.abspath(__file__), '--worker', name,
+               '--workdir', workdir, '--result', result_path, '--worker-args', json.dumps(kwargs)]
+    process = subprocess.run(command, env={**os.environ, **(env or {})},
+                             capture_output=True, text=True)
+    if process.returncode != 0:
+        return {"error": (process.stderr.strip().splitlines() or ["failed"])[-1]}
+    with open(result_path) as f:
+        return json.load(f)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_stub():
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCHMARKS_DIR, 'openai_stub.py'), '--port', str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}/v1"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{base_url}/assistants/stub", timeout=1)
+            return process, base_url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("OpenAI stub did not start")
+
+
+def environment():
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], cwd=REPO_DIR, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git('status', '--porcelain', '--untracked-files=no')
+    return {
+        "commit": git('rev-parse', 'HEAD'),
+        "dirty": bool(status) if status is not None else None,
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Corpus sizes for ir_stuff")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--uploads', type=int, default=50, help="Files per upload run")
+    parser.add_argument('--pages', type=int, default=3, help="Pages per uploaded file")
+    parser.add_argument('--preprocess-pages', type=int, default=20)
+    parser.add_argument('--preprocess-repeats', type=int, default=3)
+    parser.add_argument('--only', nargs='+', choices=sorted(WORKERS), default=sorted(WORKERS))
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'rfp-bench'),
+                        help="Where corpora are generated; reused between runs")
+    parser.add_argument('--output', help="Write the results here instead of stdout")
+    parser.add_argument('--worker', choices=sorted(WORKERS), help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    parser.add_argument('--worker-args', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = WORKERS[args.worker](args.workdir, **json.loads(args.worker_args))
+        with open(args.result, 'w') as f:
+            json.dump(result, f)
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = {}
+
+    if 'ir_stuff' in args.only:
+        results["ir_stuff"] = {}
+        for size in args.sizes:
+            # Corpora (and the ANN index built over them) are kept for later runs
+            workdir = os.path.join(args.data_dir, f"corpus-{size}")
+            start = time.perf_counter()
+            synthetic.write_corpus(os.path.join(workdir, 'temp2'), size)
+            print(f"corpus {size}: ready in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+            results["ir_stuff"][str(size)] = run_worker(
+                'ir_stuff', workdir, size=size, queries=args.queries, k=args.k)
+            print(f"ir_stuff {size}: {results['ir_stuff'][str(size)]}", file=sys.stderr)
+
+    if 'upload' in args.only:
+        workdir = tempfile.mkdtemp(dir=args.data_dir, prefix='upload-')
+        stub, base_url = start_stub()
+        try:
+            results["upload"] = run_worker('upload', workdir, env={"OPENAI_BASE_URL": base_url},
+                                           uploads=args.uploads, pages=args.pages)
+        finally:
+            stub.kill()
+            shutil.rmtree(workdir, ignore_errors=True)
+        print(f"upload: {results['upload']}", file=sys.stderr)
+
+    if 'preprocess' in args.only:
+        workdir = tempfile.mkdtemp(dir=args.data_dir, prefix='preprocess-')
+        try:
+            results["preprocess"] = run_worker('preprocess', workdir, pages=args.preprocess_pages,
+                                               repeats=args.preprocess_repeats)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        print(f"preprocess: {results['preprocess']}", file=sys.stderr)
+
+    document = json.dumps({"environment": environment(), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(document + '\n')
+    else:
+        print(document)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Deterministic synthetic data for the benchmarks: RFP-like PDFs and
+embedding store corpora.
+"""
+import hashlib
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from embedding_store import EmbeddingStore  # noqa: E402
+
+
+CATEGORIES = ['Construction', 'Consulting', 'Education', 'Engineering', 'Healthcare',
+              'Information Technology', 'Infrastructure', 'Research', 'Transportation']
+PROVINCES = ['Alberta', 'British Columbia', 'Manitoba', 'Nova Scotia', 'Ontario', 'Quebec',
+             'Saskatchewan', 'Yukon']
+WORDS = ('proposal vendor shall provide services deliverables schedule budget evaluation '
+         'criteria submission deadline contract scope requirements compliance security '
+         'maintenance support training implementation project management reporting '
+         'municipal provincial network software hardware facility design review').split()
+
+DIM = 384
+
+
+def rfp_text(seed, pages=3, paragraphs_per_page=6):
+    """
+    Text of a synthetic RFP, one string per page.
+    """
+    rng = np.random.default_rng(seed)
+    category = CATEGORIES[seed % len(CATEGORIES)]
+    province = PROVINCES[seed % len(PROVINCES)]
+    result = []
+    for page in range(pages):
+        lines = [f"Request for Proposal {seed:06d}", f"{category} services in {province}", ""]
+        for paragraph in range(paragraphs_per_page):
+            lines.append(f"SECTION {page * paragraphs_per_page + paragraph + 1}")
+            lines.append(' '.join(rng.choice(WORDS, size=60)).capitalize() + '.')
+            lines.append("")
+        lines.append(f"Page {page + 1} of {pages}")
+        result.append('\n'.join(lines))
+    return result
+
+
+def make_rfp_pdf(seed, pages=3):
+    """
+    Bytes of a synthetic RFP PDF. The same seed always yields the same text.
+    """
+    import fitz  # PyMuPDF, also used by rfp_preprocess.py
+
+    doc = fitz.open()
+    for text in rfp_text(seed, pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(54, 54, 558, 738), text, fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def write_corpus(directory, size, dim=DIM, clusters=64, seed=0, chunk=10000):
+    """
+    Fill an embedding store with `size` documents whose vectors are grouped
+    around `clusters` centres, like topically related RFPs.
+
+    Titles are "<Category>_RFP-<n>", so queries can be drawn by row number.
+
+    Returns:
+        EmbeddingStore: The populated store
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    start_time = datetime(2024, 1, 1)
+
+    store = EmbeddingStore(directory)
+    for first in range(len(store), size, chunk):
+        rows = range(first, min(first + chunk, size))
+        assignment = rng.integers(0, clusters, size=len(rows))
+        vectors = centres[assignment] + 0.5 * rng.standard_normal((len(rows), dim)).astype(np.float32)
+        entries = []
+        for row, vector in zip(rows, vectors):
+            title = corpus_title(row)
+            metadata = {
+                "category": title.split('_')[0],
+                "doc_id": f"{title}.pdf",
+                "file_path": f"/synthetic/{title}.pdf",
+                "title": title,
+                "upload_time": (start_time + timedelta(minutes=row)).isoformat(),
+                "sha256": hashlib.sha256(title.encode()).hexdigest()
+            }
+            entries.append((metadata["doc_id"], vector, metadata))
+        store.append_many(entries)
+    return store
+
+
+def corpus_title(row):
+    return f"{CATEGORIES[row % len(CATEGORIES)]}_RFP-{row:06d}"
@@ -0,0 +1,61 @@
+"""
+Report the memory of a gunicorn master and its workers, to check how much
+of the preloaded model and index the workers share.
+
+Usage: python benchmarks/worker_memory.py <master pid>
+
+Linux only: reads /proc/<pid>/smaps_rollup. PSS splits shared pages between
+the processes sharing them, so the PSS column sums to the real total.
+"""
+import os
+import sys
+
+
+FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def read_rollup(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(':') in FIELDS:
+                values[parts[0].rstrip(':')] = int(parts[1])  # kB
+    return values
+
+
+def children(pid):
+    result = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            result.append(int(entry))
+    return sorted(result)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__.strip())
+        sys.exit(1)
+
+    master = int(sys.argv[1])
+    print(f"{'process':>16s} {'RSS MB':>9s} {'PSS MB':>9s} {'shared MB':>10s} {'private MB':>11s}")
+    total_pss = 0
+    for label, pid in [('master', master)] + [(f'worker {pid}', pid) for pid in children(master)]:
+        values = read_rollup(pid)
+        shared = values['Shared_Clean'] + values['Shared_Dirty']
+        private = values['Private_Clean'] + values['Private_Dirty']
+        total_pss += values['Pss']
+        print(f"{label:>16s} {values['Rss'] / 1024:9.1f} {values['Pss'] / 1024:9.1f}"
+              f" {shared / 1024:10.1f} {private / 1024:11.1f}")
+    print(f"{'total PSS':>16s} {'':9s} {total_pss / 1024:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import json
 import sys
 import os
 
@@ -172,7 +173,7 @@ st.markdown("## WELCOME TO DOCUMENT QUERY")
 
 # Flask server URL
 BASE_URL = 'http://127.0.0.1:5500'
-ASK_URL = f'{BASE_URL}/ask'
+ASK_STREAM_URL = f'{BASE_URL}/askStream'
 THREADS_URL = f'{BASE_URL}/threads'
 
 # Initialize session state for chat history
@@ -232,42 +233,55 @@ def delete_thread(thread_id):
         st.error(f"Error deleting thread: {str(e)}")
 
 
+def stream_answer(question, thread_id):
+    """
+    Yield answer tokens from the backend's server-sent event stream.
+    """
+    payload = {"question": question, "thread_id": thread_id}
+    with requests.post(ASK_STREAM_URL, json=payload, stream=True) as response:
+        if response.status_code != 200:
+            raise RuntimeError(response.json().get("error", "An error occurred."))
+
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith('event:'):
+                event = line[len('event:'):].strip()
+            elif line.startswith('data:'):
+                data = json.loads(line[len('data:'):])
+                if event == 'token':
+                    yield data["text"]
+                elif event == 'error':
+                    raise RuntimeError(data["error"])
+
+
 def ask_question(question, thread_id):
     if not question:
         st.error("Please enter a question ❗")
         return
 
-    with st.spinner('Processing your question... 🤔'):
-        payload = {"question": question, "thread_id": thread_id}
-        try:
-            response = requests.post(ASK_URL, json=payload)
-            response_data = response.json()
-
-            if response.status_code == 200:
-                # Add to chat history
-                if thread_id not in st.session_state.chat_history:
-                    st.session_state.chat_history[thread_id] = []
-
-                st.session_state.chat_history[thread_id].append({
-                    'question': question,
-                    'answer': response_data.get("response", "No response received."),
-                    'timestamp': st.session_state.get('current_time', 'Now')
-                })
+    st.markdown(f"""
+        <div class="chat-message question">
+            <strong>Question:</strong><br>{question}
+        </div>
+    """, unsafe_allow_html=True)
 
-                # Display the latest Q&A
-                st.markdown(f"""
-                    <div class="chat-message question">
-                        <strong>Question:</strong><br>{question}
-                    </div>
-                    <div class="chat-message answer">
-                        <strong>Answer:</strong><br>{response_data.get("response", "No response received.")}
-                    </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.error(
-                    "Error: " + response_data.get("error", "An error occurred."))
-        except Exception as e:
-            st.error(f"Request failed: {str(e)}")
+    try:
+        # Render the answer token by token as the assistant produces it
+        with st.container(border=True):
+            st.markdown("**Answer:**")
+            answer = st.write_stream(stream_answer(question, thread_id))
+
+        # Add to chat history
+        if thread_id not in st.session_state.chat_history:
+            st.session_state.chat_history[thread_id] = []
+
+        st.session_state.chat_history[thread_id].append({
+            'question': question,
+            'answer': answer or "No response received.",
+            'timestamp': st.session_state.get('current_time', 'Now')
+        })
+    except Exception as e:
+        st.error(f"Request failed: {str(e)}")
 
 
 # Initialize session state
@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import os
+import time
 
 # Set page config
 st.set_page_config(page_title="File Uploader - RFP Bot",
@@ -79,7 +80,9 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Flask server URL
-UPLOAD_URL = 'http://127.0.0.1:5500/uploadFile'
+BASE_URL = 'http://127.0.0.1:5500'
+JOB_TIMEOUT_SECONDS = 600  # Stop following an upload job after this long
+UPLOAD_URL = f'{BASE_URL}/uploadFile'
 
 st.title("PDF Upload Interface")
 
@@ -92,34 +95,52 @@ uploaded_file = st.file_uploader("Choose a file", type=["pdf"])
 # Function to upload file to backend server
 
 
-def upload_file_to_backend(file_path):
-    with open(file_path, "rb") as f:
-        files = {'file': f}
-        response = requests.post(UPLOAD_URL, files=files)
-        if response.status_code == 200:
-            st.success("File successfully uploaded!")
-        else:
-            st.error("Failed to upload file.")
+def upload_file_to_backend(uploaded_file):
+    # Streamlit already holds the file in memory; send it as is
+    files = {'file': (uploaded_file.name, uploaded_file.getvalue(), 'application/pdf')}
+    response = requests.post(UPLOAD_URL, files=files)
+    if response.status_code == 200:
+        st.success("File successfully uploaded!")
+    elif response.status_code == 202:
+        # The backend processes the file in the background; follow the job
+        wait_for_job(response.json()["status_url"])
+    else:
+        st.error("Failed to upload file.")
+
+
+def wait_for_job(status_url):
+    with st.status("Processing file...", expanded=True) as status:
+        progress = st.empty()
+        deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+        while True:
+            job = requests.get(f"{BASE_URL}{status_url}", timeout=30).json()
+            progress.markdown("\n".join(
+                f"- {stage['name']}: {stage['status']}"
+                + (f" ({stage['seconds']:.2f}s)" if stage['seconds'] is not None else "")
+                for stage in job.get("stages", [])
+            ))
+            if job.get("status") == "completed":
+                status.update(label="File successfully uploaded!", state="complete")
+                st.success("File successfully uploaded!")
+                return
+            # A missing status means the job lookup itself failed
+            if job.get("status") in ("failed", None):
+                status.update(label="Failed to upload file.", state="error")
+                st.error(f"Failed to upload file: {job.get('error')}")
+                return
+            if time.monotonic() > deadline:
+                status.update(label="Still processing.", state="error")
+                st.warning(f"The file is still being processed after {JOB_TIMEOUT_SECONDS // 60} minutes; "
+                           "check back later.")
+                return
+            time.sleep(1)
 
 
 if uploaded_file:
     # Check if the uploaded file is a PDF
     if uploaded_file.type == "application/pdf":
-        # Save the uploaded file temporarily
-        temp_file_path = os.path.join("temp", uploaded_file.name)
-
-        # Ensure the 'temp' directory exists
-        os.makedirs(os.path.dirname(temp_file_path), exist_ok=True)
-
-        # Write the file to the specified path
-        with open(temp_file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-
         # Upload file to the backend
-        upload_file_to_backend(temp_file_path)
-
-        # Clean up temporary file after upload
-        os.remove(temp_file_path)
+        upload_file_to_backend(uploaded_file)
     else:
         st.error("Only PDF files are allowed. Please upload a valid PDF.")
 
@@ -7,10 +7,11 @@ from nltk.stem import PorterStemmer
 from nltk.tokenize import word_tokenize
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import faiss  # For vector indexing
 
+from backend.model_registry import get_model  # Shared, load-once embedding models
+
 # Download NLTK resources
 nltk.download('punkt')
 nltk.download('stopwords')
@@ -35,7 +36,7 @@ class RFPPreprocessor:
         self.embeddings = None
         self.stop_words = set(stopwords.words('english'))
         self.stemmer = PorterStemmer()
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model = get_model('all-MiniLM-L6-v2')
         
     def extract_text(self):
         """
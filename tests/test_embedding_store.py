@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+
+from embedding_store import EmbeddingStore
+
+
+def metadata(title):
+    return {"title": title, "category": title.split('_')[0]}
+
+
+def test_append_after_torn_metadata_line(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.append("A_1.pdf", np.ones(4), metadata("A_1"))
+
+    # A crash in the middle of a metadata write leaves a partial last line
+    with open(store.metadata_path, 'ab') as f:
+        f.write(b'{"doc_id": "A_2.pdf", "meta')
+
+    store = EmbeddingStore(str(tmp_path))
+    assert len(store) == 1
+    store.append("A_3.pdf", np.full(4, 2.0), metadata("A_3"))
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert [record["doc_id"] for record in reopened.records] == ["A_1.pdf", "A_3.pdf"]
+    np.testing.assert_array_equal(reopened.matrix()[1], np.full(4, 2.0))
+    assert os.path.getsize(reopened.metadata_path) == reopened._metadata_offset
+
+
+def test_title_rows_lists_every_copy(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.append("A_1.pdf", np.ones(4), metadata("A_1"))
+    store.append("B_2.pdf", np.ones(4), metadata("B_2"))
+    store.append("A_1.pdf", np.ones(4), metadata("A_1"))
+
+    assert store.row_for_title("A_1") == 0
+    assert EmbeddingStore(str(tmp_path)).title_rows["A_1"] == [0, 2]